@@ -0,0 +1,159 @@
+"""场景合成的规模测试：放置 100 到 10000 个模型，比较普通模式和大场景模式的耗时
+
+不依赖ComfyUI（需要NumPy），直接从节点源码中取出合成脚本交给Blender执行：
+
+    python benchmarks/compose_scaling.py --blender /path/to/blender
+    python benchmarks/compose_scaling.py --sizes 100,1000,10000 --files 10
+
+--files 控制不同模型文件的数量（其余放置为链接复制），默认每个放置各用一个文件，
+即全部为导入；所有模型在一次Blender运行中导出。耗时只统计合成脚本本身，不含Blender启动。
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NODES_DIR = os.path.join(ROOT, "nodes")
+
+sys.path.insert(0, ROOT)
+from nodes.scene_description import SceneDescription  # noqa: E402
+
+_CUBE_SCRIPT = r'''
+import bpy
+import os
+import sys
+
+# One Blender run exports every model: cube_<i>.glb with a different size each
+count, output_dir = int(sys.argv[-2]), sys.argv[-1]
+bpy.ops.wm.read_factory_settings(use_empty=True)
+for index in range(count):
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.object.delete()
+    bpy.ops.mesh.primitive_cube_add(size=1.0 + index / count)
+    bpy.ops.export_scene.gltf(filepath=os.path.join(output_dir, f"cube_{index}.glb"))
+'''
+
+
+def module_string(file_name, name):
+    """不导入模块（避免依赖ComfyUI），从源码中读取模块级字符串常量"""
+    with open(os.path.join(NODES_DIR, file_name), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return node.value.value
+    raise LookupError(f"{name} not found in {file_name}")
+
+
+def default_blender():
+    sys.path.insert(0, NODES_DIR)
+    from blender_manager import BlenderManager
+    return BlenderManager().get_blender_path()
+
+
+def make_models(work_dir, blender, files):
+    """导出 files 个大小不同的立方体glb（内容不同，不会被当作同一文件）"""
+    script_path = os.path.join(work_dir, "_cube_script.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(_CUBE_SCRIPT)
+    subprocess.run([blender, "-b", "--factory-startup", "--python", script_path, "--", str(files), work_dir],
+                   check=True, stdout=subprocess.DEVNULL)
+    return [os.path.join(work_dir, f"cube_{index}.glb") for index in range(files)]
+
+
+def run_composition(blender, script_path, work_dir, model_paths, placements, large_scene, save_blend):
+    # 与合成节点相同：场景描述写成.npz，每个模型文件的信息只传一次
+    scene = SceneDescription.from_models([{
+        "file_path": model_paths[index % len(model_paths)],
+        "position": ((index % 100) * 3.0, (index // 100) * 3.0, 0.0),
+        "rotation": (0.0, 0.0, float(index % 360)),
+        "scale": (1.0, 1.0, 1.0),
+        "name": f"cube_{index}",
+        "collection_name": "3D_Model",
+        "file_format": ".glb",
+    } for index in range(placements)])
+    scene_path = os.path.join(work_dir, f"bench_{placements}_{int(large_scene)}_scene.npz")
+    scene.save(scene_path)
+
+    files = []
+    for path, file_format in zip(scene.paths, scene.path_formats):
+        with open(path, "rb") as f:
+            files.append({"file_path": path, "file_format": file_format,
+                          "file_digest": hashlib.sha256(f.read()).hexdigest()})
+
+    param_path = os.path.join(work_dir, f"bench_{placements}_{int(large_scene)}_composer_params.json")
+    with open(param_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "output_blend": os.path.join(work_dir, "scene.blend"),
+            "output_dir": work_dir,
+            "mode": "create",
+            "background_color": "white",
+            "scene_path": scene_path,
+            "files": files,
+            "instance_digests": {},
+            "save_blend": save_blend,
+            "log_level": "quiet",
+            "dedupe_textures": False,
+            "large_scene": large_scene,
+        }, f)
+
+    result = subprocess.run([blender, "-b", "--factory-startup", "--python", script_path, "--", param_path],
+                            capture_output=True, text=True, encoding="utf-8", errors="replace")
+    timing = [line for line in result.stdout.splitlines() if line.startswith("BENCH ")]
+    composition = [line for line in result.stdout.splitlines() if line.startswith("Composition: ")]
+    if result.returncode != 0 or not timing:
+        raise RuntimeError(f"Composition failed ({result.returncode}):\n{result.stdout[-2000:]}")
+    return float(timing[-1].split()[1]), composition[-1] if composition else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blender", default=None, help="Blender executable (default: the one used by the nodes)")
+    parser.add_argument("--sizes", default="100,300,1000,3000,10000", help="comma separated placement counts")
+    parser.add_argument("--files", type=int, default=0,
+                        help="number of distinct model files (default: one per placement of the largest size)")
+    parser.add_argument("--save", action="store_true", help="also save the blend file")
+    args = parser.parse_args()
+
+    blender = args.blender or default_blender()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    files = args.files or max(sizes)
+
+    with tempfile.TemporaryDirectory(prefix="bl_compose_bench_") as work_dir:
+        # 计时包住整个合成脚本（场景初始化、放置、保存）
+        script = ("import time as _bench_time\n_bench_start = _bench_time.perf_counter()\n"
+                  + module_string("scene_index.py", "BLENDER_SCENE_INFO_FUNCTIONS")
+                  + module_string("bl_scene_composer.py", "_BLENDER_COMPOSER_SCRIPT")
+                  + "\nprint(f\"BENCH {_bench_time.perf_counter() - _bench_start:.3f}\")\n")
+        script_path = os.path.join(work_dir, "_bench_composer_script.py")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(script)
+        model_paths = make_models(work_dir, blender, files)
+
+        print(f"{'placements':>10} {'mode':>8} {'seconds':>9} {'ms/placement':>13} {'growth':>7}")
+        previous = {}
+        started = time.perf_counter()
+        for size in sizes:
+            for large_scene in (False, True):
+                mode = "large" if large_scene else "standard"
+                seconds, composition = run_composition(blender, script_path, work_dir, model_paths, size,
+                                                       large_scene, args.save)
+                # growth：耗时增长倍数除以规模增长倍数，接近1即为线性
+                growth = ""
+                if mode in previous:
+                    last_size, last_seconds = previous[mode]
+                    growth = f"{(seconds / last_seconds) / (size / last_size):.2f}"
+                previous[mode] = (size, seconds)
+                print(f"{size:>10} {mode:>8} {seconds:>9.2f} {1000 * seconds / size:>13.3f} {growth:>7}")
+                if composition and size == sizes[-1]:
+                    print(f"{'':>10} {composition}")
+        print(f"Total benchmark time: {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""渲染结果传输的测试：比较PNG/JPEG逐张解码和raw float32映射的耗时与峰值内存
+
+不启动Blender，按渲染脚本的输出格式把事先写好的图片交给渲染节点的图像加载器：
+
+    python benchmarks/image_transfer.py
+    python benchmarks/image_transfer.py --count 16 --width 1920 --height 1080
+
+每种方式在单独的子进程中运行，峰值内存为加载前后进程最大常驻内存（RSS）的增量，
+包含批次本身；仅支持Linux和macOS（需要 resource 模块）。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("png", "jpeg", "raw")
+
+
+def write_inputs(work_dir, mode, count, width, height):
+    """写出 count 张渐变图片（raw模式为一个连续的float32缓冲），返回路径列表"""
+    import numpy as np
+
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    frames = [np.stack(np.broadcast_arrays(x * (i + 1) / count, y, (x + y) / 2), axis=-1) for i in range(count)]
+    if mode == "raw":
+        path = os.path.join(work_dir, "frames.f32")
+        np.stack(frames).astype(np.float32).tofile(path)
+        return [path]
+
+    from PIL import Image
+    paths = []
+    for index, frame in enumerate(frames):
+        path = os.path.join(work_dir, f"frame_{index}.{mode}")
+        Image.fromarray((frame * 255).astype(np.uint8)).save(path, format=mode.upper())
+        paths.append(path)
+    return paths
+
+
+def max_rss_bytes():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux按KB、macOS按字节报告
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_child(mode, paths, count, width, height):
+    """子进程：加载图片并打印一行JSON结果"""
+    sys.path.insert(0, ROOT)
+    import io
+    import contextlib
+    from nodes.bl_render import _RenderImageLoader
+
+    loader = _RenderImageLoader(raw_path=paths[0] if mode == "raw" else None)
+    lines = [f"BL_RENDER_PLAN {json.dumps({'count': count, 'height': height, 'width': width})}"]
+    for index in range(count):
+        lines.append(f"BL_RENDER_IMAGE {json.dumps({'index': index, 'image_path': paths[min(index, len(paths) - 1)]})}")
+
+    before = max_rss_bytes()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for line in lines:
+            loader.on_line(line)
+        loader.finish()
+    if loader.error:
+        raise RuntimeError(loader.error)
+    # 读取整个批次，raw模式的映射页面在此时才真正载入
+    checksum = float(loader.batch.sum())
+    print(json.dumps({
+        "seconds": loader.transfer_seconds,
+        "peak_mb": (max_rss_bytes() - before) / 2**20,
+        "batch_mb": loader.batch.numel() * 4 / 2**20,
+        "checksum": checksum,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=8, help="number of images")
+    parser.add_argument("--width", type=int, default=1536)
+    parser.add_argument("--height", type=int, default=846)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated: png, jpeg, raw")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--paths", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.paths), args.count, args.width, args.height)
+        return
+
+    print(f"{args.count} images, {args.width}x{args.height}")
+    print(f"{'mode':>6} {'ms total':>9} {'ms/image':>9} {'peak MB':>8} {'batch MB':>9} {'over batch':>11}")
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory(prefix="bl_transfer_bench_") as work_dir:
+            paths = write_inputs(work_dir, mode, args.count, args.width, args.height)
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode,
+                                     "--paths", json.dumps(paths), "--count", str(args.count),
+                                     "--width", str(args.width), "--height", str(args.height)],
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"{mode} failed:\n{result.stderr[-2000:]}")
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+        milliseconds = stats["seconds"] * 1000
+        print(f"{mode:>6} {milliseconds:>9.1f} {milliseconds / args.count:>9.2f} {stats['peak_mb']:>8.1f} "
+              f"{stats['batch_mb']:>9.1f} {stats['peak_mb'] - stats['batch_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
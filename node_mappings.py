@@ -9,10 +9,13 @@ node_module_mappings = {
     'bl_camera_creator': 'BL_Camera_Creator',
     'bl_model_param': 'BL_Model_Param',
     'bl_model_merger': 'BL_Model_Merger',
+    'bl_model_collection': 'BL_Model_Collection',
+    'bl_model_scatter': 'BL_Model_Scatter',
     'bl_scene_composer': 'BL_Scene_Composer',
     'bl_render': 'BL_Render',
     'bl_export_model': 'BL_Export_Model',
     'bl_save_mesh': 'BL_Save_Mesh',
+    'bl_scene_info': 'BL_Scene_Info',
 }
 
 imported_classes = {}
@@ -35,8 +38,11 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "BL_Camera_Creator": "Camera Creator",
     "BL_Model_Param": "3D Model Param",
     "BL_Model_Merger": "3D Model Merger",
+    "BL_Model_Collection": "3D Model Collection",
+    "BL_Model_Scatter": "3D Model Scatter",
     "BL_Scene_Composer": "Blender Scene Composer",
     "BL_Render": "Blender Render",
     "BL_Export_Model": "Blender Export Model",
     "BL_Save_Mesh": "Blender Save Mesh",
+    "BL_Scene_Info": "Blender Scene Info",
 }
\ No newline at end of file
@@ -1,6 +1,5 @@
 import json
 import os
-import subprocess
 
 # 尝试导入 ComfyUI 的 folder_paths，如果失败则使用备用方案
 try:
@@ -10,7 +9,8 @@ except ImportError:
     FOLDER_PATHS_AVAILABLE = False
     print("Warning: folder_paths not available, using fallback path handling")
 
-from .blender_manager import BlenderManager
+from .blender_job import blender_job_dir, publish_file
+from .scene_plan import ScenePlan, ScenePlanStep
 
 class BL_Export_Model:
     @classmethod
@@ -28,11 +28,14 @@ class BL_Export_Model:
                 "apply_transforms": ("BOOLEAN", {"default": True}),
                 "include_animations": ("BOOLEAN", {"default": True}),
                 "include_textures": ("BOOLEAN", {"default": True}),
+                "scene": ("BLENDER_SCENE",),
+                "defer": ("BOOLEAN", {"default": False}),
+                "use_worker_pool": ("BOOLEAN", {"default": True}),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING",)
-    RETURN_NAMES = ("exported_path", "log",)
+    RETURN_TYPES = ("STRING", "STRING", "BLENDER_SCENE",)
+    RETURN_NAMES = ("exported_path", "log", "scene",)
     FUNCTION = "export_model"
     CATEGORY = "Blender"
     DESCRIPTION = "将Blender文件导出为GLB格式"
@@ -79,7 +82,8 @@ class BL_Export_Model:
 
     def export_model(self, blend_file_path, export_format="GLB", output_folder="exported_models", 
                     output_filename="exported_model", export_selected_only=False, 
-                    apply_transforms=True, include_animations=True, include_textures=True, use_full_path=False):
+                    apply_transforms=True, include_animations=True, include_textures=True, use_full_path=False,
+                    scene=None, defer=False, use_worker_pool=True):
         # 初始化日志
         log_messages = []
         log_messages.append(f"Starting model export...")
@@ -90,20 +94,29 @@ class BL_Export_Model:
         log_messages.append(f"Include textures: {include_textures}")
         log_messages.append(f"Use full path: {use_full_path}")
         
-        # 解析blend文件路径
-        resolved_blend_path = self._resolve_blend_file_path(blend_file_path)
-        if not resolved_blend_path:
-            error_msg = "No blend file path provided"
-            log_messages.append(f"ERROR: {error_msg}")
-            return ("", "\n".join(log_messages))
+        # 上游传入延迟执行的场景计划时，导出在同一个Blender会话中接着上游步骤执行
+        plan = scene if scene is not None and scene.deferred else None
+        if scene is not None and not scene.deferred and scene.blend_path:
+            blend_file_path = scene.blend_path
         
-        # 检查文件是否存在
-        if not os.path.exists(resolved_blend_path):
-            error_msg = f"Blend file not found: {resolved_blend_path}"
-            log_messages.append(f"ERROR: {error_msg}")
-            return ("", "\n".join(log_messages))
-        
-        log_messages.append(f"Using blend file: {resolved_blend_path}")
+        if plan is not None:
+            resolved_blend_path = ""
+            log_messages.append(f"Using scene plan: {plan.describe()}")
+        else:
+            # 解析blend文件路径
+            resolved_blend_path = self._resolve_blend_file_path(blend_file_path)
+            if not resolved_blend_path:
+                error_msg = "No blend file path provided"
+                log_messages.append(f"ERROR: {error_msg}")
+                return ("", "\n".join(log_messages), ScenePlan())
+            
+            # 检查文件是否存在
+            if not os.path.exists(resolved_blend_path):
+                error_msg = f"Blend file not found: {resolved_blend_path}"
+                log_messages.append(f"ERROR: {error_msg}")
+                return ("", "\n".join(log_messages), ScenePlan())
+            
+            log_messages.append(f"Using blend file: {resolved_blend_path}")
         
         # 获取输出目录
         output_dir = self._get_output_directory(output_folder)
@@ -122,49 +135,61 @@ class BL_Export_Model:
         log_messages.append(f"Output file: {output_file}")
         log_messages.append(f"Full path: {full_output_path}")
         
-        # Path configuration
-        blender_bin = BlenderManager().get_blender_path()
+        def script(job_dir):
+            # 准备Blender脚本内容，导出到作业目录
+            job_output_path = os.path.join(job_dir, f"{output_filename}.{file_extension}")
+            return _BLENDER_EXPORT_SCRIPT.replace(
+                "{blend_file_path}", resolved_blend_path
+            ).replace(
+                "{use_current_scene}", str(plan is not None)
+            ).replace(
+                "{output_path}", job_output_path
+            ).replace(
+                "{export_format}", export_format
+            ).replace(
+                "{export_selected_only}", str(export_selected_only)
+            ).replace(
+                "{apply_transforms}", str(apply_transforms)
+            ).replace(
+                "{include_animations}", str(include_animations)
+            ).replace(
+                "{include_textures}", str(include_textures)
+            )
         
-        # 准备Blender脚本内容
-        script_content = _BLENDER_EXPORT_SCRIPT.replace(
-            "{blend_file_path}", resolved_blend_path
-        ).replace(
-            "{output_path}", full_output_path
-        ).replace(
-            "{export_format}", export_format
-        ).replace(
-            "{export_selected_only}", str(export_selected_only)
-        ).replace(
-            "{apply_transforms}", str(apply_transforms)
-        ).replace(
-            "{include_animations}", str(include_animations)
-        ).replace(
-            "{include_textures}", str(include_textures)
-        )
-        
-        # 写入临时脚本文件
-        script_path = os.path.join(output_dir, f"{output_filename}_export_script.py")
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(script_content)
-        
-        # 调用Blender执行脚本
-        cmd = [blender_bin, "--background", "--factory-startup", "--python", script_path]
-        try:
-            subprocess.run(cmd, check=True)
+        def complete(job_dir, returncode, output, log_messages):
+            if returncode != 0:
+                log_messages.append(f"Blender call failed: Blender exited with return code {returncode}")
+                log_messages.extend(output.summary())
+                return
             log_messages.append(f"Blender export successful: {output_file}")
             
-        except Exception as e:
-            log_messages.append(f"Blender call failed: {e}")
-            return (output_file, "\n".join(log_messages))
+            # 检查输出文件是否存在，存在则原子地发布
+            job_output_path = os.path.join(job_dir, f"{output_filename}.{file_extension}")
+            if os.path.exists(job_output_path):
+                publish_file(job_output_path, full_output_path)
+                file_size = os.path.getsize(full_output_path)
+                log_messages.append(f"Exported file size: {file_size} bytes")
+            else:
+                log_messages.append(f"WARNING: Exported file not found: {full_output_path}")
         
-        # 检查输出文件是否存在
-        if os.path.exists(full_output_path):
-            file_size = os.path.getsize(full_output_path)
-            log_messages.append(f"Exported file size: {file_size} bytes")
-        else:
-            log_messages.append(f"WARNING: Exported file not found: {full_output_path}")
+        step = ScenePlanStep("export", script, complete=complete)
+        base_plan = plan if plan is not None else ScenePlan(resolved_blend_path)
         
-        return (output_file, "\n".join(log_messages))
+        # 延迟执行：把导出追加到场景计划，由下游节点一并执行
+        if defer:
+            log_messages.append("Export deferred to the downstream Render/Export node")
+            return (output_file, "\n".join(log_messages), base_plan.then(step))
+        
+        # 每次导出使用独占的作业目录，导出完成后原子地发布到输出路径
+        with blender_job_dir(output_dir, "export") as job_dir:
+            try:
+                base_plan.then(step).execute(job_dir, [], log_messages, use_pool=use_worker_pool)
+            except Exception as e:
+                log_messages.append(f"Blender call failed: {e}")
+        
+        # 下游节点可以直接使用上游已保存的blend文件
+        blend_path = base_plan.blend_path if os.path.exists(base_plan.blend_path) else ""
+        return (output_file, "\n".join(log_messages), ScenePlan(blend_path))
 
 # Blender export script
 _BLENDER_EXPORT_SCRIPT = r'''
@@ -175,6 +200,7 @@ import json
 
 # Embedded parameters
 blend_file_path = "{blend_file_path}"
+use_current_scene = {use_current_scene}
 output_path = "{output_path}"
 export_format = "{export_format}"
 export_selected_only = {export_selected_only}
@@ -182,15 +208,17 @@ apply_transforms = {apply_transforms}
 include_animations = {include_animations}
 include_textures = {include_textures}
 
-print(f"Loading blend file: {blend_file_path}")
-
-# Load the blend file
-try:
-    bpy.ops.wm.open_mainfile(filepath=blend_file_path)
-    print(f"Successfully loaded blend file: {blend_file_path}")
-except Exception as e:
-    print(f"Error loading blend file: {e}")
-    sys.exit(1)
+# Load the blend file, unless an earlier step in this session already built the scene
+if use_current_scene:
+    print("Exporting the current scene")
+else:
+    print(f"Loading blend file: {blend_file_path}")
+    try:
+        bpy.ops.wm.open_mainfile(filepath=blend_file_path)
+        print(f"Successfully loaded blend file: {blend_file_path}")
+    except Exception as e:
+        print(f"Error loading blend file: {e}")
+        sys.exit(1)
 
 # Get objects to export
 if export_selected_only:
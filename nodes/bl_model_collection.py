@@ -0,0 +1,201 @@
+import csv
+import glob
+import json
+import os
+
+from .model_utils import SUPPORTED_FORMATS, build_model_data, get_base_dir, normalize_models, validate_model
+from .scene_description import SceneDescription
+
+# 可连接的模型输入个数
+MODEL_INPUTS = 8
+# 日志中最多逐条列出的错误数
+MAX_LOGGED_ERRORS = 20
+
+
+class BL_Model_Collection:
+    @classmethod
+    def INPUT_TYPES(cls):
+        optional = {
+            "path_pattern": ("STRING", {"default": "", "multiline": False}),
+            "manifest_path": ("STRING", {"default": "", "multiline": False}),
+            "collection_name": ("STRING", {"default": "3D_Model", "multiline": False}),
+            "spacing": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1000, "step": 0.1}),
+            "max_triangles": ("INT", {"default": 0, "min": 0, "max": 100000000, "step": 1000}),
+            "limit_file_mb": ("INT", {"default": 0, "min": 0, "max": 1000000}),
+            "limit_triangles": ("INT", {"default": 0, "min": 0, "max": 1000000000, "step": 1000}),
+            "limit_texture_size": ("INT", {"default": 0, "min": 0, "max": 65536, "step": 256}),
+            "limit_action": (["warn", "reject"], {"default": "warn"}),
+        }
+        for index in range(1, MODEL_INPUTS + 1):
+            optional[f"models_{index}"] = ("MODELS",)
+        return {
+            "required": {
+                "folder_type": (["input", "output"], {"default": "input"}),
+            },
+            "optional": optional
+        }
+
+    RETURN_TYPES = ("MODELS", "STRING",)
+    RETURN_NAMES = ("models", "log",)
+    FUNCTION = "collect_models"
+    CATEGORY = "Blender"
+    DESCRIPTION = "Collect 3D models from a folder or glob pattern, a JSON/CSV placement manifest and model inputs"
+
+    def collect_models(self, folder_type="input", path_pattern="", manifest_path="", collection_name="3D_Model",
+                       spacing=0.0, max_triangles=0, limit_file_mb=0, limit_triangles=0, limit_texture_size=0,
+                       limit_action="warn", **model_inputs):
+        # 初始化日志
+        log_messages = []
+        base_dir = get_base_dir(folder_type)
+        limits = (limit_file_mb, limit_triangles, limit_texture_size)
+        models = []
+        errors = []
+        warnings = 0
+        counts = {"pattern": 0, "manifest": 0, "inputs": 0}
+
+        def add(source, full_path, **placement):
+            nonlocal warnings
+            # 清单项中显式的 max_triangles=0 表示不减面，不能被节点的设置覆盖
+            entry_triangles = placement.pop("max_triangles", None)
+            model_data, problems, error = build_model_data(
+                full_path, collection_name=placement.pop("collection_name", None) or collection_name,
+                max_triangles=max_triangles if entry_triangles is None else entry_triangles,
+                limits=limits, limit_action=limit_action, **placement)
+            if model_data is None:
+                errors.append(error)
+                return
+            warnings += len(problems)
+            models.append(model_data)
+            counts[source] += 1
+
+        # 文件夹或glob：按文件名排序，沿X轴以 spacing 间隔排列
+        if path_pattern.strip():
+            for index, full_path in enumerate(self._pattern_files(base_dir, path_pattern.strip())):
+                add("pattern", full_path, position=(index * spacing, 0.0, 0.0))
+
+        # 放置清单：每行（或每项）一个模型及其变换
+        if manifest_path.strip():
+            manifest_file = os.path.join(base_dir, manifest_path.strip())
+            try:
+                entries, entry_errors = self._read_manifest(manifest_file)
+                errors.extend(entry_errors)
+            except (OSError, ValueError) as e:
+                entries = []
+                errors.append(f"Failed to read manifest {manifest_file}: {e}")
+            for entry in entries:
+                try:
+                    self._check_manifest_entry(entry)
+                    add("manifest", os.path.join(base_dir, entry.pop("file_path")), **entry)
+                except (KeyError, TypeError, ValueError) as e:
+                    errors.append(f"Invalid manifest entry {entry}: {e}")
+
+        # 已连接的模型输入原样加入（与模型合并节点的校验一致），场景描述整体加入
+        for index in range(1, MODEL_INPUTS + 1):
+            model_input = model_inputs.get(f"models_{index}")
+            if isinstance(model_input, SceneDescription):
+                models.append(model_input)
+                counts["inputs"] += len(model_input)
+                continue
+            for model in normalize_models(model_input):
+                if validate_model(model):
+                    models.append(model)
+                    counts["inputs"] += 1
+                else:
+                    errors.append(f"Invalid model format in models_{index}: {model}")
+
+        # 输出结构数组形式的场景描述，合成节点无需再逐个处理字典
+        scene = SceneDescription.from_models(models)
+        log_messages.append(f"Collected {len(scene)} models: {counts['pattern']} from pattern, "
+                            f"{counts['manifest']} from manifest, {counts['inputs']} from inputs")
+        if warnings:
+            log_messages.append(f"WARNING: {warnings} probe warning(s), see probe_warnings of each model")
+        if errors:
+            log_messages.append(f"Skipped {len(errors)} model(s):")
+            log_messages.extend(f"  {error}" for error in errors[:MAX_LOGGED_ERRORS])
+            if len(errors) > MAX_LOGGED_ERRORS:
+                log_messages.append(f"  ... and {len(errors) - MAX_LOGGED_ERRORS} more")
+
+        log = "\n".join(log_messages)
+        print(log)
+        if not len(scene):
+            print("ERROR: No valid models collected")
+            return (None, log)
+        return (scene, log)
+
+    @staticmethod
+    def _pattern_files(base_dir, pattern):
+        """文件夹返回其中支持格式的文件，否则按glob匹配（支持**）"""
+        full_pattern = os.path.join(base_dir, pattern)
+        if os.path.isdir(full_pattern):
+            full_pattern = os.path.join(full_pattern, "*")
+        return sorted(path for path in glob.glob(full_pattern, recursive=True)
+                      if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_FORMATS)
+
+    @staticmethod
+    def _check_manifest_entry(entry):
+        """检查清单项的字段类型，变换必须是3个数，不合格时抛出 ValueError"""
+        for key in ("position", "rotation", "scale"):
+            if key not in entry:
+                continue
+            value = entry[key]
+            if (not isinstance(value, (list, tuple)) or len(value) != 3
+                    or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)):
+                raise ValueError(f"{key} must be a list of 3 numbers, got {value!r}")
+            entry[key] = tuple(float(v) for v in value)
+        for key in ("name", "collection_name"):
+            if key in entry and not isinstance(entry[key], str):
+                raise ValueError(f"{key} must be a string, got {entry[key]!r}")
+        if "max_triangles" in entry and (not isinstance(entry["max_triangles"], int)
+                                         or isinstance(entry["max_triangles"], bool)):
+            raise ValueError(f"max_triangles must be an integer, got {entry['max_triangles']!r}")
+
+    @staticmethod
+    def _read_manifest(manifest_file):
+        """读取JSON或CSV放置清单，返回 (build_model_data 的参数字典列表, 无效行的错误列表)
+
+        JSON为列表（或带 "models" 键的对象），每项包含 file_path 以及可选的 name、position、rotation、
+        scale、collection_name、max_triangles；CSV的列为 file_path、name、position_x..scale_z、
+        collection_name、max_triangles，缺少的列取默认值。文件本身无法读取时抛出 ValueError。
+        """
+        if manifest_file.lower().endswith(".csv"):
+            entries = []
+            errors = []
+            with open(manifest_file, "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f)
+                if not reader.fieldnames or "file_path" not in reader.fieldnames:
+                    raise ValueError("manifest CSV needs a file_path column")
+                for row in reader:
+                    # 与JSON清单一样逐行检查，一行无效只跳过该行
+                    try:
+                        entries.append(BL_Model_Collection._csv_entry(row))
+                    except ValueError as e:
+                        errors.append(f"Invalid manifest row {reader.line_num}: {e}")
+            return entries, errors
+
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("models", [])
+        if not isinstance(data, list):
+            raise ValueError("manifest must be a list of models")
+        allowed = {"file_path", "name", "position", "rotation", "scale", "collection_name", "max_triangles"}
+        return [{key: value for key, value in entry.items() if key in allowed}
+                for entry in data if isinstance(entry, dict)], []
+
+    @staticmethod
+    def _csv_entry(row):
+        """把一行CSV转换为清单项，值无效时抛出 ValueError"""
+        # 列数不足的行中缺少的值为None
+        file_path = (row.get("file_path") or "").strip()
+        if not file_path:
+            raise ValueError("file_path is empty")
+        entry = {"file_path": file_path}
+        for key, default in (("position", 0.0), ("rotation", 0.0), ("scale", 1.0)):
+            entry[key] = tuple(float(row.get(f"{key}_{axis}") or default) for axis in "xyz")
+        if row.get("name"):
+            entry["name"] = row["name"].strip()
+        if row.get("collection_name"):
+            entry["collection_name"] = row["collection_name"].strip()
+        if row.get("max_triangles"):
+            entry["max_triangles"] = int(row["max_triangles"])
+        return entry
@@ -1,3 +1,6 @@
+from .model_utils import normalize_models, validate_model
+from .scene_description import SceneDescription
+
 class BL_Model_Merger:
     @classmethod
     def INPUT_TYPES(cls):
@@ -20,31 +23,11 @@ class BL_Model_Merger:
             print("ERROR: One or both 3D models are None")
             return (None,)
         
-        # 标准化输入为列表格式
-        def normalize_models(models):
-            if models is None:
-                return []
-            elif isinstance(models, dict):
-                return [models]
-            elif isinstance(models, list):
-                return models
-            else:
-                print(f"WARNING: Unexpected model format: {type(models)}")
-                return []
-        
-        # 验证模型数据格式
-        def validate_model(model):
-            if not isinstance(model, dict):
-                return False
-            
-            # 检查是否是摄像机
-            if model.get("type") == "camera":
-                required_keys = ['type', 'name', 'position', 'rotation', 'scale', 'collection_name', 'focal_length']
-            else:
-                # 检查是否是3D模型
-                required_keys = ['file_path', 'position', 'rotation', 'scale', 'name']
-            
-            return all(key in model for key in required_keys)
+        # 任一输入为场景描述时直接按数组合并，不展开为字典
+        if isinstance(model_1, SceneDescription) or isinstance(model_2, SceneDescription):
+            merged = SceneDescription.from_models([model_1, model_2])
+            print(f"Total valid objects: {len(merged)}")
+            return (merged,)
         
         # 获取模型列表
         models_1 = normalize_models(model_1)
@@ -1,5 +1,6 @@
 import os
-import folder_paths
+
+from .model_utils import build_model_data, get_base_dir
 
 class BL_Model_Param:
     @classmethod
@@ -20,6 +21,11 @@ class BL_Model_Param:
                 "scale_y": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "scale_z": ("FLOAT", {"default": 1.0, "step": 0.01}),
                 "collection_name": ("STRING", {"default": "3D_Model", "multiline": False}),
+                "max_triangles": ("INT", {"default": 0, "min": 0, "max": 100000000, "step": 1000}),
+                "limit_file_mb": ("INT", {"default": 0, "min": 0, "max": 1000000}),
+                "limit_triangles": ("INT", {"default": 0, "min": 0, "max": 1000000000, "step": 1000}),
+                "limit_texture_size": ("INT", {"default": 0, "min": 0, "max": 65536, "step": 256}),
+                "limit_action": (["warn", "reject"], {"default": "warn"}),
             }
         }
 
@@ -31,45 +37,40 @@ class BL_Model_Param:
 
     def load_model(self, model_file_path, folder_type="input", position_x=0.0, position_y=0.0, position_z=0.0,
                   rotation_x=0.0, rotation_y=0.0, rotation_z=0.0,
-                  scale_x=1.0, scale_y=1.0, scale_z=1.0, collection_name="3D_Model"):
-        # 根据选择获取对应的目录
-        if folder_type == "input":
-            base_dir = folder_paths.get_input_directory()
-        else:  # output
-            base_dir = folder_paths.get_output_directory()
-            
-        full_model_path = os.path.join(base_dir, model_file_path)
-        
-        # 检查文件是否存在
-        if not os.path.exists(full_model_path):
-            print(f"ERROR: Model file not found: {full_model_path}")
-            return (None,)
+                  scale_x=1.0, scale_y=1.0, scale_z=1.0, collection_name="3D_Model", max_triangles=0,
+                  limit_file_mb=0, limit_triangles=0, limit_texture_size=0, limit_action="warn"):
+        full_model_path = os.path.join(get_base_dir(folder_type), model_file_path)
         
-        # 检查文件格式
-        file_ext = os.path.splitext(model_file_path)[1].lower()
-        supported_formats = ['.glb', '.gltf', '.fbx', '.obj']
-        
-        if file_ext not in supported_formats:
-            print(f"ERROR: Unsupported file format: {file_ext}")
-            print(f"Supported formats: {', '.join(supported_formats)}")
+        # 检查文件并创建模型数据字典
+        model_data, problems, error = build_model_data(
+            full_model_path,
+            position=(position_x, position_y, position_z),
+            rotation=(rotation_x, rotation_y, rotation_z),
+            scale=(scale_x, scale_y, scale_z),
+            collection_name=collection_name,
+            max_triangles=max_triangles,
+            limits=(limit_file_mb, limit_triangles, limit_texture_size),
+            limit_action=limit_action
+        )
+        if model_data is None:
+            print(f"ERROR: {error}")
             return (None,)
+        for problem in problems:
+            print(f"WARNING: {problem}")
         
-        # 创建模型数据字典
-        model_data = {
-            "file_path": full_model_path,
-            "position": (position_x, position_y, position_z),
-            "rotation": (rotation_x, rotation_y, rotation_z),
-            "scale": (scale_x, scale_y, scale_z),
-            "name": os.path.splitext(os.path.basename(model_file_path))[0],
-            "collection_name": collection_name,
-            "file_format": file_ext
-        }
-        
+        file_ext = model_data["file_format"]
+        probe = model_data["probe"]
         print(f"Loaded {file_ext.upper()} model: {model_data['name']}")
         print(f"From {folder_type} folder: {model_file_path}")
         print(f"Collection: {collection_name}")
         print(f"Position: ({position_x}, {position_y}, {position_z})")
         print(f"Rotation: ({rotation_x}, {rotation_y}, {rotation_z})")
         print(f"Scale: ({scale_x}, {scale_y}, {scale_z})")
+        if max_triangles:
+            print(f"Max triangles: {max_triangles}")
+        if "triangles" in probe:
+            print(f"Probe: {probe['triangles']} triangles, {probe['vertices']} vertices, "
+                  f"{len(probe['images'])} textures (max {probe['max_texture_size']} px), "
+                  f"{probe['file_size'] / (1024 * 1024):.1f} MB")
         
         return (model_data,) 
\ No newline at end of file
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+
+from .model_utils import build_model_data, get_base_dir
+
+# 分布模式
+SCATTER_MODES = ["grid", "random", "curve"]
+# 最小间距采样时每批候选点数相对目标数量的倍数，以及最多尝试的批数
+_CANDIDATE_FACTOR = 4
+_MAX_BATCHES = 32
+# 一批候选点中被接受的比例低于此值时视为区域已填满，停止采样
+_MIN_ACCEPT_RATIO = 0.001
+
+
+class BL_Model_Scatter:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "folder_type": (["input", "output"], {"default": "input"}),
+                "model_file_path": ("STRING", {"default": ""}),
+                "mode": (SCATTER_MODES, {"default": "grid"}),
+                "count": ("INT", {"default": 100, "min": 1, "max": 1000000}),
+            },
+            "optional": {
+                "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffff}),
+                "position_x": ("FLOAT", {"default": 0.0, "min": -1000, "max": 1000, "step": 0.1}),
+                "position_y": ("FLOAT", {"default": 0.0, "min": -1000, "max": 1000, "step": 0.1}),
+                "position_z": ("FLOAT", {"default": 0.0, "min": -1000, "max": 1000, "step": 0.1}),
+                "spacing": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1000, "step": 0.1}),
+                "area_x": ("FLOAT", {"default": 10.0, "min": 0.0, "max": 10000, "step": 0.1}),
+                "area_y": ("FLOAT", {"default": 10.0, "min": 0.0, "max": 10000, "step": 0.1}),
+                "curve_points": ("STRING", {"default": "0,0,0; 10,0,0", "multiline": True}),
+                "align_to_curve": ("BOOLEAN", {"default": True}),
+                "jitter": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1000, "step": 0.01}),
+                "min_distance": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1000, "step": 0.01}),
+                "random_rotation_z": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 180, "step": 0.1}),
+                "scale_min": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1000, "step": 0.01}),
+                "scale_max": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1000, "step": 0.01}),
+                "collection_name": ("STRING", {"default": "3D_Model", "multiline": False}),
+                "max_triangles": ("INT", {"default": 0, "min": 0, "max": 100000000, "step": 1000}),
+            }
+        }
+
+    RETURN_TYPES = ("MODELS",)
+    RETURN_NAMES = ("models",)
+    FUNCTION = "scatter_model"
+    CATEGORY = "Blender"
+    DESCRIPTION = "Place many instances of a 3D model on a grid, at random or along a curve"
+
+    def scatter_model(self, model_file_path, folder_type="input", mode="grid", count=100, seed=0,
+                      position_x=0.0, position_y=0.0, position_z=0.0, spacing=1.0, area_x=10.0, area_y=10.0,
+                      curve_points="0,0,0; 10,0,0", align_to_curve=True, jitter=0.0, min_distance=0.0,
+                      random_rotation_z=0.0, scale_min=1.0, scale_max=1.0, collection_name="3D_Model",
+                      max_triangles=0):
+        full_model_path = os.path.join(get_base_dir(folder_type), model_file_path)
+        model_data, problems, error = build_model_data(full_model_path,
+                                                       position=(position_x, position_y, position_z),
+                                                       collection_name=collection_name, max_triangles=max_triangles)
+        if model_data is None:
+            print(f"ERROR: {error}")
+            return (None,)
+        for problem in problems:
+            print(f"WARNING: {problem}")
+
+        rng = np.random.default_rng(seed)
+        try:
+            positions, rotations = scatter_positions(rng, mode, count, spacing, area_x, area_y, curve_points,
+                                                     align_to_curve, min_distance)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return (None,)
+        if len(positions) < count:
+            print(f"WARNING: Only {len(positions)} of {count} instances fit with min_distance {min_distance}")
+        count = len(positions)
+
+        # 随机分布的点本身已是随机的；在最小间距采样之后再抖动会打破间距保证，因此忽略抖动
+        if jitter and mode == "random" and min_distance > 0:
+            print(f"WARNING: jitter is ignored with min_distance {min_distance}")
+            jitter = 0.0
+
+        # 抖动、随机朝向和统一缩放，全部按数组一次生成
+        if jitter:
+            positions[:, :2] += rng.uniform(-jitter, jitter, (count, 2)).astype(np.float32)
+        if random_rotation_z:
+            rotations[:, 2] += rng.uniform(-random_rotation_z, random_rotation_z, count).astype(np.float32)
+        scales = rng.uniform(scale_min, max(scale_min, scale_max), (count, 1)).astype(np.float32)
+        scales = np.repeat(scales, 3, axis=1)
+
+        # 整组实例作为一个条目，由合成节点生成实例而不是逐个导入
+        model_data["type"] = "scatter"
+        model_data["instances"] = {"positions": positions, "rotations": rotations, "scales": scales}
+
+        print(f"Scattered {count} instances of {model_data['name']} ({mode})")
+        return ([model_data],)
+
+
+def scatter_positions(rng, mode, count, spacing, area_x, area_y, curve_points, align_to_curve, min_distance):
+    """返回 (位置, 旋转角度) 两个 float32 的 (N, 3) 数组，N 可能因最小间距而小于 count"""
+    rotations = np.zeros((count, 3), dtype=np.float32)
+    if mode == "grid":
+        columns = int(np.ceil(np.sqrt(count)))
+        index = np.arange(count)
+        positions = np.zeros((count, 3), dtype=np.float32)
+        positions[:, 0] = (index % columns - (columns - 1) / 2) * spacing
+        positions[:, 1] = (index // columns - (np.ceil(count / columns) - 1) / 2) * spacing
+    elif mode == "random":
+        if min_distance > 0:
+            points = poisson_disk(rng, count, area_x, area_y, min_distance)
+        else:
+            points = rng.uniform((-area_x / 2, -area_y / 2), (area_x / 2, area_y / 2), (count, 2))
+        positions = np.zeros((len(points), 3), dtype=np.float32)
+        positions[:, :2] = points
+        rotations = rotations[:len(points)]
+    elif mode == "curve":
+        positions, yaw = sample_polyline(parse_points(curve_points), count)
+        if align_to_curve:
+            rotations[:, 2] = yaw
+    else:
+        raise ValueError(f"Unknown scatter mode: {mode}")
+    return positions, rotations
+
+
+def parse_points(text):
+    """解析 "x,y,z; x,y,z" （分号或换行分隔）形式的折线顶点"""
+    points = [[float(value) for value in point.split(",")] for point in text.replace("\n", ";").split(";")
+              if point.strip()]
+    if len(points) < 2 or any(len(point) != 3 for point in points):
+        raise ValueError(f"curve_points needs at least two x,y,z points: {text!r}")
+    return np.array(points, dtype=np.float64)
+
+
+def sample_polyline(points, count):
+    """沿折线按弧长均匀取 count 个点，返回位置和切线方向的绕Z角度（度）"""
+    segments = np.diff(points, axis=0)
+    lengths = np.linalg.norm(segments, axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+    distances = np.linspace(0.0, cumulative[-1], count)
+    segment = np.clip(np.searchsorted(cumulative, distances, side="right") - 1, 0, len(segments) - 1)
+    t = (distances - cumulative[segment]) / np.where(lengths[segment] > 0, lengths[segment], 1.0)
+    positions = points[segment] + segments[segment] * t[:, None]
+    yaw = np.degrees(np.arctan2(segments[segment, 1], segments[segment, 0]))
+    return positions.astype(np.float32), yaw.astype(np.float32)
+
+
+def poisson_disk(rng, count, area_x, area_y, min_distance):
+    """在区域内随机取最多 count 个两两间距不小于 min_distance 的点
+
+    用空间哈希做拒绝采样：格子边长 r/√2，每格最多一个点，只需检查周围5x5格。已占用格子的键按升序
+    保存在数组中并用二分查找，内存只与已放置的点数有关，与区域面积无关。
+    候选点按格子坐标模3分为9类，同一类中不同格子的点相距必然大于 r，因此每类可整批向量化接受。
+    每格最多一个点，所以每批候选数不超过格子数的若干倍；某批几乎没有接受新点时区域已接近饱和，提前结束。
+    """
+    cell = min_distance / np.sqrt(2)
+    low = np.array((-area_x / 2, -area_y / 2))
+    # 格子键 = x格 * stride + y格，y方向四周各留两格，邻域偏移不会串到相邻列
+    stride = int(np.ceil(area_y / cell)) + 5
+    offsets = [dx * stride + dy for dx in range(-2, 3) for dy in range(-2, 3)]
+    capacity = int(np.ceil(area_x / cell)) * int(np.ceil(area_y / cell))
+    points = np.empty((0, 2))
+    keys = np.empty(0, dtype=np.int64)
+    owners = np.empty(0, dtype=np.int64)
+
+    for _ in range(_MAX_BATCHES):
+        placed = len(points)
+        wanted = max(min(count - placed, capacity), 1)
+        candidates = rng.uniform(low, -low, (wanted * _CANDIDATE_FACTOR, 2))
+        cells = ((candidates - low) / cell).astype(np.int64) + 2
+        cell_keys = cells[:, 0] * stride + cells[:, 1]
+        classes = (cells[:, 0] % 3) * 3 + cells[:, 1] % 3
+        for cls in range(9):
+            members = np.flatnonzero(classes == cls)
+            if len(members) == 0:
+                continue
+            # 每个格子只取第一个候选，且格子必须为空
+            _, first = np.unique(cell_keys[members], return_index=True)
+            members = members[first]
+            members = members[_lookup_cells(keys, owners, cell_keys[members]) < 0]
+            ok = np.ones(len(members), dtype=bool)
+            for offset in offsets:
+                neighbors = _lookup_cells(keys, owners, cell_keys[members] + offset)
+                has = neighbors >= 0
+                if has.any():
+                    distance = np.linalg.norm(points[neighbors[has]] - candidates[members[has]], axis=1)
+                    ok[np.flatnonzero(has)[distance < min_distance]] = False
+            members = members[ok][:count - len(points)]
+            keys = np.concatenate((keys, cell_keys[members]))
+            owners = np.concatenate((owners, np.arange(len(points), len(points) + len(members))))
+            order = np.argsort(keys, kind="stable")
+            keys, owners = keys[order], owners[order]
+            points = np.concatenate((points, candidates[members]))
+            if len(points) >= count:
+                return points
+        if len(points) - placed <= len(candidates) * _MIN_ACCEPT_RATIO:
+            break
+    return points
+
+
+def _lookup_cells(keys, owners, query):
+    """在有序的格子键中查找，返回各查询格子中的点序号，空格子为-1"""
+    if len(keys) == 0:
+        return np.full(len(query), -1, dtype=np.int64)
+    index = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return np.where(keys[index] == query, owners[index], -1)
@@ -1,11 +1,21 @@
 import json
+import math
 import os
-import subprocess
+import tempfile
+import time
 import torch
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageOps
-from .blender_manager import BlenderManager
+from .blender_job import blender_job_dir, publish_file
+from .blender_output import BlenderLogCapture, BlenderProgress
+from .blender_worker_pool import run_blender_script
+from .disk_cache import DiskLRUCache, file_digest, params_digest
+from .scene_index import lookup_scene_info, missing_cameras
+
+# 渲染结果缓存，容量可通过环境变量调整（MB）
+RENDER_CACHE = DiskLRUCache("render", int(os.environ.get("BLENDER_RENDER_CACHE_MB", "4096")) * 1024 * 1024)
 
 
 class BL_Render:
@@ -24,30 +34,104 @@ class BL_Render:
             "optional": {
                 "output_folder": ("STRING", {"default": "blender"}),
                 "output_filename": ("STRING", {"default": "render"}),
+                "camera_names": ("STRING", {"default": "", "multiline": True}),
+                "camera_collection": ("STRING", {"default": ""}),
+                "render_animation": ("BOOLEAN", {"default": False}),
+                "frame_start": ("INT", {"default": 1, "min": -100000, "max": 100000}),
+                "frame_end": ("INT", {"default": 1, "min": -100000, "max": 100000}),
+                "frame_step": ("INT", {"default": 1, "min": 1, "max": 1000}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "transfer_mode": (["file", "raw"], {"default": "file"}),
+                "tiles": ("INT", {"default": 1, "min": 1, "max": 64}),
+                "render_passes": ("BOOLEAN", {"default": False}),
+                "draft_mode": (["off", "workbench", "eevee"], {"default": "off"}),
+                "draft_resolution_percentage": ("INT", {"default": 50, "min": 10, "max": 100, "step": 5}),
+                "time_budget": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 3600.0, "step": 0.5}),
+                "scene": ("BLENDER_SCENE",),
+                "use_worker_pool": ("BOOLEAN", {"default": True}),
             }
         }
 
-    RETURN_TYPES = ("STRING", "IMAGE", "STRING",)
-    RETURN_NAMES = ("blend_path", "image", "log",)
+    RETURN_TYPES = ("STRING", "IMAGE", "STRING", "IMAGE", "IMAGE", "MASK",)
+    RETURN_NAMES = ("blend_path", "image", "log", "depth", "normal", "mask",)
     FUNCTION = "render_scene"
     CATEGORY = "Blender"
     DESCRIPTION = "从指定blend文件中渲染3D场景"
 
+    @classmethod
+    def IS_CHANGED(cls, blend_file_path="", **kwargs):
+        # blend文件内容不变时让ComfyUI跳过该节点，其余输入由ComfyUI自行比较
+        try:
+            return file_digest(blend_file_path)
+        except (OSError, TypeError):
+            return ""
+
     def render_scene(self, blend_file_path, camera_name="camera", output_filename="render", samples=256,
                      output_folder="renders", use_cycles=False, image_format="PNG", resolution_x=1536, 
-                     resolution_y=846):
+                     resolution_y=846, camera_names="", camera_collection="", render_animation=False,
+                     frame_start=1, frame_end=1, frame_step=1, use_cache=True, transfer_mode="file",
+                     tiles=1, render_passes=False, draft_mode="off", draft_resolution_percentage=50,
+                     time_budget=0.0, scene=None, use_worker_pool=True):
+        # 时间预算从节点开始执行时计时（包括等待worker、启动Blender和加载场景）
+        node_started = time.time()
+        # 上游传入延迟执行的场景计划时，在同一个Blender会话中先执行上游步骤再渲染
+        plan = scene if scene is not None and scene.deferred else None
+        if scene is not None and (plan is not None or scene.blend_path):
+            blend_file_path = scene.blend_path
+        
         # 初始化日志
         log_messages = []
         log_messages.append(f"Starting render process...")
         log_messages.append(f"Blend file: {blend_file_path}")
-        log_messages.append(f"Camera name: {camera_name}")
-        log_messages.append(f"Samples: {samples}")
+        # 多相机批量渲染：相机名列表（逗号或换行分隔）和/或相机集合
+        camera_list = [name.strip() for name in camera_names.replace("\n", ",").split(",") if name.strip()]
+        camera_collection = camera_collection.strip()
+        if camera_list or camera_collection:
+            if camera_list:
+                log_messages.append(f"Camera names: {', '.join(camera_list)}")
+            if camera_collection:
+                log_messages.append(f"Camera collection: {camera_collection}")
+        else:
+            camera_list = [camera_name]
+            log_messages.append(f"Camera name: {camera_name}")
+        if render_animation:
+            log_messages.append(f"Frames: {frame_start}-{frame_end} (step {frame_step})")
+            if frame_end < frame_start:
+                # 空的帧范围不能退化为只渲染当前帧
+                log_messages.append(f"ERROR: frame_end ({frame_end}) is before frame_start ({frame_start})")
+                black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
+                return _render_outputs(blend_file_path, black_image, None, log_messages)
+        # 草稿模式：Workbench或最简Eevee，降低分辨率百分比，用于快速预览相机构图
+        if draft_mode != "off":
+            use_cycles = False
+            if draft_mode == "workbench" and render_passes:
+                log_messages.append("WARNING: Render passes are not available with the Workbench draft engine")
+                render_passes = False
+        # 时间预算模式：Cycles自适应采样加time_limit，samples作为采样上限
+        if time_budget > 0:
+            if draft_mode != "off":
+                log_messages.append("WARNING: Time budget is ignored in draft mode")
+                time_budget = 0.0
+            else:
+                use_cycles = True
+                log_messages.append(f"Time budget: {time_budget:.1f} s (max samples {samples})")
+        if draft_mode == "off" and not time_budget:
+            log_messages.append(f"Samples: {samples}")
         log_messages.append(f"Resolution: {resolution_x}x{resolution_y}")
-        log_messages.append(f"Format: {image_format}")
-        log_messages.append(f"Engine: {'Cycles' if use_cycles else 'Eevee Next'}")
-        
-        # Path configuration - 使用ComfyUI标准路径
-        blender_bin = BlenderManager().get_blender_path()
+        if draft_mode != "off":
+            log_messages.append(f"Draft: {draft_mode} at {draft_resolution_percentage}%")
+        log_messages.append(f"Format: {image_format if transfer_mode == 'file' else 'raw float32'}")
+        engine_name = {"off": "Cycles" if use_cycles else "Eevee Next", "workbench": "Workbench", "eevee": "Eevee Next (draft)"}
+        log_messages.append(f"Engine: {engine_name[draft_mode]}")
+        if plan is not None:
+            log_messages.append(f"Scene plan: {plan.describe()}")
+            if tiles > 1:
+                log_messages.append("WARNING: Tiled rendering is not available for deferred scenes")
+                tiles = 1
+        if tiles > 1:
+            log_messages.append(f"Tiles: {tiles}")
+        if render_passes:
+            log_messages.append("Render passes: depth, normal, mask")
         
         # 获取ComfyUI输出目录
         import folder_paths
@@ -56,95 +140,491 @@ class BL_Render:
         os.makedirs(output_dir, exist_ok=True)
         
         # Check if source blend file exists
-        if not os.path.exists(blend_file_path):
+        if plan is None and not os.path.exists(blend_file_path):
             error_msg = f"Source blend file not found: {blend_file_path}"
             log_messages.append(f"ERROR: {error_msg}")
             # 返回全黑图片
             black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
-            return (blend_file_path, black_image, "\n".join(log_messages))
+            return _render_outputs(blend_file_path, black_image, None, log_messages)
+        
+        # 已索引的场景在启动Blender之前检查相机是否存在
+        scene_info = lookup_scene_info(blend_file_path) if plan is None else None
+        if scene_info is not None:
+            missing = missing_cameras(scene_info, camera_list, camera_collection)
+            if missing:
+                available = ", ".join(camera["name"] for camera in scene_info["cameras"]) or "(none)"
+                log_messages.append(f"ERROR: Camera '{', '.join(missing)}' not found (available: {available})")
+                black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
+                return _render_outputs(blend_file_path, black_image, None, log_messages)
         
         # Prepare parameters for Blender script
         params = {
             "blend_file_path": blend_file_path,
             "output_dir": output_dir,
-            "camera_name": camera_name,
+            "camera_names": camera_list,
+            "camera_collection": camera_collection,
+            "frames": list(range(frame_start, frame_end + 1, frame_step)) if render_animation else [],
             "use_cycles": use_cycles,
             "samples": samples,
             "resolution_x": resolution_x,
             "resolution_y": resolution_y,
             "image_format": image_format,
-            "output_filename": output_filename
+            "output_filename": output_filename,
+            "transfer_mode": transfer_mode,
+            "render_passes": render_passes,
+            "draft_mode": draft_mode,
+            "draft_resolution_percentage": draft_resolution_percentage,
+            "time_budget": time_budget,
+            # 墙上时间的截止时刻，Blender脚本据此扣除启动之前已经花掉的时间
+            "deadline": node_started + time_budget if time_budget > 0 else None,
+            "use_current_scene": plan is not None,
         }
         
+        # 渲染缓存：以blend文件内容哈希加全部渲染参数为键
+        cache_key = None
+        if use_cache and plan is not None:
+            log_messages.append("Render cache is skipped for deferred scenes")
+        elif use_cache:
+            try:
+                cache_key = _render_cache_key(params)
+                cached = _load_cached_render(cache_key)
+            except Exception as e:
+                cached = None
+                log_messages.append(f"WARNING: Render cache unavailable: {e}")
+            if cached is not None:
+                images, passes, suffixes = cached
+                log_messages.append(f"Render cache hit: {cache_key[:16]}")
+                log_messages.append(f"Loaded {images.shape[0]} cached image(s)")
+                # 输出路径不属于缓存键：file模式下把缓存的图片写到本次请求的文件名
+                if suffixes:
+                    with blender_job_dir(output_dir, "render") as job_dir:
+                        for image, suffix in zip(images, suffixes):
+                            name = f"{output_filename}{suffix}"
+                            image_path = publish_file(_save_image(image, os.path.join(job_dir, name), image_format),
+                                                      os.path.join(output_dir, name))
+                            log_messages.append(f"Wrote cached image: {image_path}")
+                return _render_outputs(blend_file_path, images, passes, log_messages)
+        
+        # 每次渲染使用独占的作业目录，多个渲染可以安全地并发写同一个输出目录
+        with blender_job_dir(output_dir, "render") as job_dir:
+            if tiles > 1:
+                rendered = self._run_tiled_render_job(params, job_dir, output_dir, log_messages, tiles)
+            else:
+                rendered = self._run_render_job(params, job_dir, output_dir, log_messages, use_worker_pool, plan)
+        
+        # 时间预算不是硬上限：每次渲染至少采样0.1秒，场景同步、降噪、写出和拼接也可能超出预留
+        if time_budget > 0:
+            elapsed = time.time() - node_started
+            if elapsed > time_budget:
+                log_messages.append(f"WARNING: Time budget exceeded: {elapsed:.1f} s of {time_budget:.1f} s")
+            else:
+                log_messages.append(f"Time used: {elapsed:.1f} s of {time_budget:.1f} s")
+        
+        if rendered is not None:
+            images, passes, image_names = rendered
+            if cache_key is not None:
+                try:
+                    suffixes = [name[len(output_filename):] for name in image_names]
+                    _store_cached_render(cache_key, images, passes, quantize=transfer_mode == "file",
+                                         suffixes=suffixes)
+                    log_messages.append(f"Stored render in cache: {cache_key[:16]}")
+                except Exception as e:
+                    log_messages.append(f"WARNING: Failed to store render in cache: {e}")
+            return _render_outputs(blend_file_path, images, passes, log_messages)
+        
+        # 返回全黑图片
+        black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
+        return _render_outputs(blend_file_path, black_image, None, log_messages)
+
+    def _run_render_job(self, params, job_dir, output_dir, log_messages, use_worker_pool, plan=None):
+        """在作业目录中运行渲染脚本，把图片发布到输出目录
+
+        返回 (IMAGE批次, 渲染通道, 写出的图片文件名列表)，失败时返回None。
+        """
+        start = time.perf_counter()
+        try:
+            loader, progress, render_result = self._invoke_render(dict(params, output_dir=job_dir), use_worker_pool,
+                                                                  plan=plan, log_messages=log_messages)
+            log_messages.append(f"Blender render successful ({time.perf_counter() - start:.2f} s)")
+        except Exception as e:
+            log_messages.append(f"Blender call failed: {e}")
+            return None
+        log_messages.append(progress.summary())
+        
+        if not self._check_render(loader, render_result, log_messages):
+            return None
+        
+        # 原子地发布渲染图片到输出目录
+        image_names = []
+        for entry in render_result["images"]:
+            image_path = entry["image_path"]
+            if image_path:
+                image_names.append(os.path.basename(image_path))
+                image_path = publish_file(image_path, os.path.join(output_dir, os.path.basename(image_path)))
+            log_messages.append(f"Camera '{entry['camera_name']}' frame {entry['frame']}: {image_path or 'raw'}")
+        log_messages.append(f"Rendered {loader.loaded} image(s)")
+        log_messages.append(loader.transfer_summary())
+        if loader.passes is not None:
+            _normalize_depth(loader.passes["depth"], loader.passes["mask"])
+        return loader.batch, loader.passes, image_names
+
+    def _run_tiled_render_job(self, params, job_dir, output_dir, log_messages, tiles):
+        """把画面切成多个区域，由多个绑定到不同CPU集合的Blender进程并行渲染后拼接"""
+        rows, cols = _tile_grid(tiles)
+        cpu_sets = _split_cpus(rows * cols)
+        threads = max(1, (os.cpu_count() or 1) // (rows * cols))
+        
+        tile_params = []
+        for index in range(rows * cols):
+            tile_dir = os.path.join(job_dir, f"tile_{index}")
+            os.makedirs(tile_dir, exist_ok=True)
+            tile_params.append(dict(
+                params,
+                output_dir=tile_dir,
+                tile=[index % cols, index // cols, cols, rows],
+                threads=len(cpu_sets[index]) if cpu_sets else threads,
+            ))
+        log_messages.append(f"Tile grid: {rows}x{cols}, "
+                            f"{'pinned to ' + str(len(cpu_sets[0])) + ' CPU(s) each' if cpu_sets else 'not pinned'}")
+        
+        # 每个分块使用独立进程（常驻worker无法为单个作业绑核）
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(tile_params)) as executor:
+            # 只有第一个分块驱动进度条
+            futures = [
+                executor.submit(self._invoke_render, tile, False, cpu_sets[index] if cpu_sets else None, index == 0)
+                for index, tile in enumerate(tile_params)
+            ]
+        results = []
+        for index, future in enumerate(futures):
+            try:
+                loader, progress, render_result = future.result()
+            except Exception as e:
+                log_messages.append(f"Tile {index}: Blender call failed: {e}")
+                return None
+            if not self._check_render(loader, render_result, log_messages):
+                return None
+            results.append((loader, render_result))
+            log_messages.append(f"Tile {index} {progress.summary()}")
+        log_messages.append(f"Blender tiled render successful ({time.perf_counter() - start:.2f} s)")
+        
+        # 拼接分块
+        plan = results[0][0].plan
+        batch = torch.empty((plan["count"], plan["frame_height"], plan["frame_width"], 3), dtype=torch.float32)
+        passes = None
+        if results[0][0].passes is not None:
+            passes = {
+                name: torch.empty(batch.shape[:3] + tensor.shape[3:], dtype=torch.float32)
+                for name, tensor in results[0][0].passes.items()
+            }
+        for loader, _ in results:
+            x0, y0, x1, y1 = loader.plan["tile_rect"]
+            batch[:, y0:y1, x0:x1, :] = loader.batch
+            for name, tensor in (loader.passes or {}).items():
+                passes[name][:, y0:y1, x0:x1] = tensor
+        # 深度在拼接后统一归一化，避免各分块按各自的远近范围换算而出现接缝
+        if passes is not None:
+            _normalize_depth(passes["depth"], passes["mask"])
+        
+        # file模式下把拼接后的图片写入输出目录
+        image_names = []
+        for index, entry in enumerate(results[0][1]["images"]):
+            image_path = entry["image_path"]
+            if image_path:
+                image_names.append(os.path.basename(image_path))
+                tmp_path = os.path.join(job_dir, os.path.basename(image_path))
+                _save_image(batch[index], tmp_path, params["image_format"])
+                image_path = publish_file(tmp_path, os.path.join(output_dir, os.path.basename(image_path)))
+            log_messages.append(f"Camera '{entry['camera_name']}' frame {entry['frame']}: {image_path or 'raw'}")
+        log_messages.append(f"Rendered {batch.shape[0]} image(s) from {len(results)} tiles")
+        return batch, passes, image_names
+
+    def _invoke_render(self, params, use_worker_pool, cpus=None, show_progress=True, plan=None, log_messages=None):
+        """在 params["output_dir"] 中运行一次渲染脚本，返回(loader, progress, render_result)
+
+        Blender的输出逐行解析：图片载入批次，进度和阶段耗时交给 BlenderProgress。
+        给出 plan 时先在同一个会话中执行计划中的步骤。Blender调用失败时抛出异常。
+        """
+        job_dir = params["output_dir"]
+        # raw模式下Blender把浮点像素直接写入共享内存文件，跳过PNG编码与解码
+        params = dict(params, raw_path=_raw_transfer_path() if params["transfer_mode"] == "raw" else None)
+        # 深度、法线和遮罩通道由Blender转换为float32缓冲写入作业目录
+        if params.get("render_passes"):
+            params["pass_paths"] = {name: os.path.join(job_dir, f"_pass_{name}.f32") for name in _PASS_NAMES}
+        
         # Write parameters to JSON file
-        param_json = os.path.join(output_dir, "_render_params.json")
+        param_json = os.path.join(job_dir, "_render_params.json")
         with open(param_json, "w") as f:
             json.dump(params, f, default=str)
         
         # Write Blender script
-        script_path = os.path.join(output_dir, "_render_blender_script.py")
+        script_path = os.path.join(job_dir, "_render_blender_script.py")
         with open(script_path, "w", encoding="utf-8") as f:
             f.write(_BLENDER_RENDER_SCRIPT)
         
-        # Call Blender
-        cmd = [blender_bin, "--background", "--factory-startup", "--python", script_path, "--", param_json]
+        # Call Blender, decoding images into the IMAGE batch as they are written
+        loader = _RenderImageLoader(raw_path=params["raw_path"], pass_paths=params.get("pass_paths"))
+        progress = BlenderProgress(show_progress=show_progress)
+        # 控制台输出：延迟场景由计划按其详细程度打印；单独渲染时汇总逐采样的状态行和标记行
+        console = BlenderLogCapture(tail_lines=1, max_errors=1) if plan is None else None
+        
+        def on_line(line):
+            if console is not None:
+                console.feed(line)
+            if log_messages is not None and line.startswith(_RAW_FALLBACK_PREFIX):
+                log_messages.append(line)
+            loader.on_line(line)
+            progress.feed(line)
+            if loader.plan is not None:
+                progress.total = loader.plan["count"]
+        
         try:
-            subprocess.run(cmd, check=True)
-            log_messages.append(f"Blender render successful")
-        except Exception as e:
-            log_messages.append(f"Blender call failed: {e}")
-            # 返回全黑图片
-            black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
-            return (blend_file_path, black_image, "\n".join(log_messages))
+            if plan is not None:
+                returncode = plan.execute(job_dir, [(script_path, [param_json])], log_messages,
+                                          on_line=on_line, use_pool=use_worker_pool)
+            else:
+                returncode = run_blender_script(script_path, [param_json], on_line=on_line,
+                                                use_pool=use_worker_pool, cpus=cpus)
+            if returncode != 0:
+                raise RuntimeError(f"Blender exited with return code {returncode}")
+        finally:
+            loader.finish()
         
         # Read render results
-        rendered_json = os.path.join(output_dir, "render_result.json")
+        rendered_json = os.path.join(job_dir, "render_result.json")
         if os.path.exists(rendered_json):
             with open(rendered_json, "r") as f:
                 render_result = json.load(f)
-                log_messages.append(f"Render result: {render_result.get('status', 'unknown')}")
         else:
             render_result = {"status": "error", "message": "Render result file not found"}
-            log_messages.append(f"ERROR: Render result file not found")
-        
-        # Read image as ComfyUI IMAGE format
-        def pil2tensor(image):
-            image = ImageOps.exif_transpose(image)
-            arr = np.array(image).astype(np.float32) / 255.0  # (H, W, 3)
-            if arr.ndim == 2:  # Grayscale image
-                arr = np.stack([arr]*3, axis=-1)
-            if arr.shape[-1] == 4:  # RGBA to RGB
-                arr = arr[..., :3]
-            arr = arr[None, ...]  # (1, H, W, 3)
-            return torch.from_numpy(arr).float()
-        
-        # Check if camera was found and image was rendered
-        if render_result.get("status") == "success" and render_result.get("image_path"):
-            image_path = render_result["image_path"]
-            if os.path.exists(image_path):
-                try:
-                    img = Image.open(image_path).convert("RGB")
-                    tensor = pil2tensor(img)
-                    log_messages.append(f"Image loaded successfully: {image_path}")
-                    return (blend_file_path, tensor, "\n".join(log_messages))
-                except Exception as e:
-                    log_messages.append(f"ERROR: Failed to load image: {e}")
-            else:
-                log_messages.append(f"ERROR: Rendered image file not found: {image_path}")
-        else:
+        return loader, progress, render_result
+
+    def _check_render(self, loader, render_result, log_messages):
+        """检查相机是否找到、图片是否全部载入"""
+        log_messages.append(f"Render result: {render_result.get('status', 'unknown')}")
+        if render_result.get("status") != "success":
             log_messages.append(f"ERROR: {render_result.get('message', 'Unknown render error')}")
-        
-        # 返回全黑图片
-        black_image = torch.zeros((1, resolution_y, resolution_x, 3), dtype=torch.float32)
-        return (blend_file_path, black_image, "\n".join(log_messages))
+            return False
+        if loader.error:
+            log_messages.append(f"ERROR: {loader.error}")
+            return False
+        if loader.batch is None or loader.loaded != loader.batch.shape[0]:
+            log_messages.append(f"ERROR: Only {loader.loaded} rendered image(s) were loaded")
+            return False
+        return True
+
+
+def _tile_grid(tiles):
+    """返回最接近正方形的 (行数, 列数) 分块方式"""
+    rows = int(math.sqrt(tiles))
+    while tiles % rows:
+        rows -= 1
+    return rows, tiles // rows
+
+
+def _split_cpus(count):
+    """把当前进程可用的CPU分成count个互不相交的集合，不支持绑核的系统返回None"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < count:
+        return None
+    size = len(cpus) // count
+    return [cpus[i * size:(i + 1) * size] for i in range(count)]
+
+
+def _save_image(image, path, image_format):
+    arr = image.mul(255.0).round_().clamp_(0, 255).to(torch.uint8).numpy()
+    Image.fromarray(arr).save(path, format=image_format)
+    return path
+
+
+def _render_cache_key(params):
+    cache_params = {k: v for k, v in params.items()
+                    if k not in ("blend_file_path", "output_dir", "output_filename", "raw_path", "deadline")}
+    return params_digest(file_digest(params["blend_file_path"]), cache_params)
+
+
+def _load_cached_render(cache_key):
+    """命中时返回(IMAGE批次, 渲染通道或None, 图片文件名在 output_filename 之后的部分)
+
+    file模式的旧缓存项没有记录文件名，无法写出图片，视为未命中。
+    """
+    path = RENDER_CACHE.get(cache_key, ".npz")
+    if path is None:
+        return None
+    with np.load(path) as data:
+        images = torch.from_numpy(data["images"])
+        passes = {name: torch.from_numpy(data[name]) for name in _PASS_NAMES if name in data.files}
+        suffixes = [str(suffix) for suffix in data["suffixes"]] if "suffixes" in data.files else None
+    if images.dtype == torch.uint8:
+        if suffixes is None:
+            return None
+        images = images.float().div_(255.0)
+    return images, passes or None, suffixes
+
+
+def _store_cached_render(cache_key, batch, passes=None, quantize=True, suffixes=()):
+    # 8位格式的渲染结果按uint8无损存储，体积为浮点的1/4
+    if quantize:
+        images = batch.mul(255.0).round_().to(torch.uint8).numpy()
+    else:
+        images = batch.numpy()
+    arrays = {name: tensor.numpy() for name, tensor in (passes or {}).items()}
+    tmp_path = RENDER_CACHE.reserve(cache_key, ".npz")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, images=images, suffixes=np.array(suffixes, dtype=str), **arrays)
+    except Exception:
+        RENDER_CACHE.discard(tmp_path)
+        raise
+    RENDER_CACHE.commit(cache_key, ".npz", tmp_path)
+
+
+_PASS_NAMES = ("depth", "normal", "mask")
+
+
+def _normalize_depth(depth, mask):
+    """把渲染脚本输出的原始距离按每帧最近、最远的表面就地映射为 1.0 到 0.1，背景为0"""
+    for index in range(depth.shape[0]):
+        valid = mask[index] > 0
+        if not valid.any():
+            depth[index] = 0.0
+            continue
+        values = depth[index][valid]
+        near, far = values.min(), values.max()
+        scaled = 1.0 - 0.9 * (depth[index] - near) / max(float(far - near), 1e-6)
+        depth[index] = torch.where(valid, scaled, torch.zeros_like(scaled))
+    return depth
+
+
+def _render_outputs(blend_file_path, images, passes, log_messages):
+    """组装节点输出，未渲染的通道返回与图片同尺寸的全零张量"""
+    count, height, width, _ = images.shape
+    passes = passes or {}
+    if "depth" in passes:
+        depth = passes["depth"].unsqueeze(-1).expand(-1, -1, -1, 3).contiguous()
+    else:
+        depth = torch.zeros((count, height, width, 3), dtype=torch.float32)
+    normal = passes.get("normal")
+    if normal is None:
+        normal = torch.zeros((count, height, width, 3), dtype=torch.float32)
+    mask = passes.get("mask")
+    if mask is None:
+        mask = torch.zeros((count, height, width), dtype=torch.float32)
+    return (blend_file_path, images, "\n".join(log_messages), depth, normal, mask)
+
+
+_RENDER_PLAN_PREFIX = "BL_RENDER_PLAN "
+_RENDER_IMAGE_PREFIX = "BL_RENDER_IMAGE "
+# 渲染脚本无法在合成器中应用视图变换、raw模式改用16位PNG时打印的警告
+_RAW_FALLBACK_PREFIX = "WARNING: Raw transfer falls back"
+
+
+def _raw_transfer_path():
+    # 优先使用共享内存（tmpfs），避免像素数据落盘
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    fd, path = tempfile.mkstemp(prefix="bl_render_", suffix=".f32", dir=directory)
+    os.close(fd)
+    return path
+
+
+class _RenderImageLoader:
+    """解析渲染脚本的输出行，把渲染结果放入IMAGE批次
+
+    file模式逐张把PNG/JPEG解码进预分配的批次，每次只保留一张8位解码图像；
+    raw模式直接把Blender写好的float32缓冲映射为张量，不做解码和拷贝。
+    """
+
+    def __init__(self, raw_path=None, pass_paths=None):
+        self.raw_path = raw_path
+        self.pass_paths = pass_paths
+        self.passes = None
+        self.plan = None
+        self.shape = None
+        self.batch = None
+        self.loaded = 0
+        self.error = None
+        self.transfer_seconds = 0.0
+
+    def on_line(self, line):
+        try:
+            if line.startswith(_RENDER_PLAN_PREFIX):
+                plan = self.plan = json.loads(line[len(_RENDER_PLAN_PREFIX):])
+                self.shape = (plan["count"], plan["height"], plan["width"], 3)
+                if self.raw_path is None:
+                    self.batch = torch.empty(self.shape, dtype=torch.float32)
+            elif line.startswith(_RENDER_IMAGE_PREFIX):
+                entry = json.loads(line[len(_RENDER_IMAGE_PREFIX):])
+                if self.raw_path is None:
+                    self._load(entry)
+                else:
+                    self.loaded += 1
+        except Exception as e:
+            self.error = self.error or f"Failed to load image: {e}"
+
+    def _load(self, entry):
+        if self.batch is None:
+            raise RuntimeError("render plan missing")
+        start = time.perf_counter()
+        with Image.open(entry["image_path"]) as img:
+            arr = np.array(ImageOps.exif_transpose(img).convert("RGB"))  # (H, W, 3) uint8
+        slot = self.batch[entry["index"]]
+        if tuple(slot.shape) != arr.shape:
+            raise RuntimeError(f"image size {arr.shape[1]}x{arr.shape[0]} does not match the render plan")
+        slot.copy_(torch.from_numpy(arr)).div_(255.0)
+        self.loaded += 1
+        self.transfer_seconds += time.perf_counter() - start
+
+    def finish(self):
+        """映射raw像素缓冲、读取渲染通道并删除临时文件（POSIX上映射在文件删除后仍然有效）"""
+        complete = self.shape is not None and self.error is None and self.loaded == self.shape[0]
+        try:
+            if complete and self.raw_path is not None:
+                start = time.perf_counter()
+                if os.name == "nt":
+                    arr = np.fromfile(self.raw_path, dtype=np.float32).reshape(self.shape)
+                else:
+                    arr = np.memmap(self.raw_path, dtype=np.float32, mode="c", shape=self.shape)
+                self.batch = torch.from_numpy(arr)
+                self.transfer_seconds += time.perf_counter() - start
+            if complete and self.pass_paths:
+                count, height, width, _ = self.shape
+                shapes = {"depth": (count, height, width), "normal": (count, height, width, 3),
+                          "mask": (count, height, width)}
+                self.passes = {
+                    name: torch.from_numpy(np.fromfile(self.pass_paths[name], dtype=np.float32).reshape(shape))
+                    for name, shape in shapes.items()
+                }
+        except Exception as e:
+            self.error = self.error or f"Failed to read render output: {e}"
+        finally:
+            if self.raw_path is not None:
+                try:
+                    os.remove(self.raw_path)
+                except OSError:
+                    pass
+
+    def transfer_summary(self):
+        # 只报告实测的耗时和批次大小；解码时的峰值内存见 benchmarks/image_transfer.py
+        frame_bytes = self.batch[0].numel() * 4
+        mode = "file decode" if self.raw_path is None else "raw map"
+        return (f"Image transfer ({mode}): {self.loaded} image(s) in {self.transfer_seconds * 1000:.1f} ms, "
+                f"batch {self.loaded * frame_bytes / 2**20:.1f} MB")
+
 
 # Independent Blender script content
 _BLENDER_RENDER_SCRIPT = r'''
 import bpy
 import sys
 import os
+import glob
 import json
 import math
+import time
+
+script_started = time.monotonic()
+print("BL_PHASE script_start", flush=True)
 
 # Get parameters
 param_json = None
@@ -161,48 +641,97 @@ with open(param_json, "r") as f:
 
 blend_file_path = params["blend_file_path"]
 output_dir = params["output_dir"]
-camera_name = params["camera_name"]
+camera_names = params["camera_names"]
+camera_collection = params.get("camera_collection", "")
+frames = params.get("frames", [])
 use_cycles = params["use_cycles"]
 samples = params["samples"]
 resolution_x = params["resolution_x"]
 resolution_y = params["resolution_y"]
 image_format = params["image_format"]
 output_filename = params["output_filename"]
+transfer_mode = params.get("transfer_mode", "file")
+raw_path = params.get("raw_path")
+tile = params.get("tile")
+threads = params.get("threads", 0)
+render_passes = params.get("render_passes", False)
+pass_paths = params.get("pass_paths")
+draft_mode = params.get("draft_mode", "off")
+draft_resolution_percentage = params.get("draft_resolution_percentage", 100)
+time_budget = params.get("time_budget", 0.0)
 
-# Initialize Blender scene
-bpy.ops.wm.read_factory_settings(use_empty=True)
-bpy.context.scene.unit_settings.system = 'METRIC'
-bpy.context.scene.unit_settings.scale_length = 1.0
+# Load the blend file, unless earlier steps in this session already built the scene
+if params.get("use_current_scene"):
+    print("Rendering the current scene")
+else:
+    # Initialize Blender scene
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    bpy.context.scene.unit_settings.system = 'METRIC'
+    bpy.context.scene.unit_settings.scale_length = 1.0
 
-# Load the blend file
-try:
-    bpy.ops.wm.open_mainfile(filepath=blend_file_path)
-    print(f"Successfully loaded blend file: {blend_file_path}")
-except Exception as e:
-    print(f"Error loading blend file: {e}")
-    result = {"status": "error", "message": f"Failed to load blend file: {e}"}
-    with open(os.path.join(output_dir, "render_result.json"), "w") as f:
-        json.dump(result, f)
-    sys.exit(1)
+    try:
+        print("BL_PHASE load_start", flush=True)
+        bpy.ops.wm.open_mainfile(filepath=blend_file_path)
+        print("BL_PHASE load_done", flush=True)
+        print(f"Successfully loaded blend file: {blend_file_path}")
+    except Exception as e:
+        print(f"Error loading blend file: {e}")
+        result = {"status": "error", "message": f"Failed to load blend file: {e}"}
+        with open(os.path.join(output_dir, "render_result.json"), "w") as f:
+            json.dump(result, f)
+        sys.exit(1)
 
-# Find camera by name
-target_camera = None
+# Find cameras by name and/or collection
+cameras_by_name = {}
 for obj in bpy.data.objects:
-    if obj.type == "CAMERA" and obj.name.lower() == camera_name.lower():
-        target_camera = obj
-        break
+    if obj.type == "CAMERA":
+        cameras_by_name.setdefault(obj.name.lower(), obj)
+
+target_cameras = []
+missing_cameras = []
+for camera_name in camera_names:
+    camera = cameras_by_name.get(camera_name.lower())
+    if camera is None:
+        missing_cameras.append(camera_name)
+    elif camera not in target_cameras:
+        target_cameras.append(camera)
 
-if not target_camera:
-    print(f"Camera '{camera_name}' not found in blend file")
-    result = {"status": "error", "message": f"Camera '{camera_name}' not found"}
+if camera_collection:
+    collection = bpy.data.collections.get(camera_collection)
+    if collection is None:
+        missing_cameras.append(f"collection:{camera_collection}")
+    else:
+        for obj in sorted(collection.all_objects, key=lambda o: o.name):
+            if obj.type == "CAMERA" and obj not in target_cameras:
+                target_cameras.append(obj)
+
+if missing_cameras or not target_cameras:
+    missing = ", ".join(missing_cameras) if missing_cameras else camera_collection
+    print(f"Camera '{missing}' not found in blend file")
+    result = {"status": "error", "message": f"Camera '{missing}' not found"}
     with open(os.path.join(output_dir, "render_result.json"), "w") as f:
         json.dump(result, f)
     sys.exit(1)
 
-print(f"Found camera: {target_camera.name}")
+print(f"Found cameras: {', '.join(camera.name for camera in target_cameras)}")
 
 # Set render engine
-if use_cycles:
+if draft_mode == "workbench":
+    # Solid shading with material colors: no sampling, no lighting evaluation
+    bpy.context.scene.render.engine = 'BLENDER_WORKBENCH'
+    bpy.context.scene.display.shading.light = 'STUDIO'
+    bpy.context.scene.display.shading.color_type = 'MATERIAL'
+    bpy.context.scene.display.render_aa = 'FXAA'
+    print("Using Workbench draft engine")
+elif draft_mode == "eevee":
+    # Minimal Eevee: few samples, no raytracing or soft shadows
+    bpy.context.scene.render.engine = 'BLENDER_EEVEE_NEXT'
+    bpy.context.scene.eevee.taa_render_samples = 4
+    bpy.context.scene.eevee.use_raytracing = False
+    bpy.context.scene.eevee.use_shadows = False
+    bpy.context.scene.eevee.use_volumetric_shadows = False
+    print("Using Eevee Next draft engine")
+elif use_cycles:
     bpy.context.scene.render.engine = 'CYCLES'
     bpy.context.scene.cycles.samples = samples
     bpy.context.scene.cycles.use_denoising = True
@@ -220,6 +749,10 @@ else:
 bpy.context.scene.render.resolution_x = resolution_x
 bpy.context.scene.render.resolution_y = resolution_y
 bpy.context.scene.render.image_settings.file_format = image_format
+if draft_mode != "off":
+    bpy.context.scene.render.resolution_percentage = draft_resolution_percentage
+    if image_format == "PNG":
+        bpy.context.scene.render.image_settings.compression = 0
 print(f"Set resolution: {resolution_x}x{resolution_y}, format: {image_format}")
 
 # Set world background to white
@@ -229,35 +762,308 @@ bpy.context.scene.world.use_nodes = True
 bg = bpy.context.scene.world.node_tree.nodes.get("Background")
 if bg:
     bg.inputs[0].default_value = (1,1,1,1)
+# Workbench renders the world color instead of the node tree
+bpy.context.scene.world.color = (1, 1, 1)
 print("Set white background")
 
-# Set camera
-bpy.context.scene.camera = target_camera
-print(f"Set active camera: {target_camera.name}")
-
 # Create output directory
 os.makedirs(output_dir, exist_ok=True)
 
-# Render image
-img_path = os.path.join(output_dir, f"{output_filename}.{image_format.lower()}")
-bpy.context.scene.render.filepath = img_path
+# Render every frame and camera in this session
+scene = bpy.context.scene
+render_frames = frames or [scene.frame_current]
+render_count = len(render_frames) * len(target_cameras)
+if render_count > 1:
+    # Keep scene data between renders (Cycles)
+    scene.render.use_persistent_data = True
+
+# Time budget: split what is left before the node's deadline across the renders and let
+# adaptive sampling stop each one at its time limit (sync, denoise, write and the node's
+# image loading and stitching are not covered by time_limit, so keep a reserve for them)
+if time_budget and use_cycles:
+    deadline = params.get("deadline")
+    if deadline:
+        remaining = deadline - time.time()
+    else:
+        remaining = time_budget - (time.monotonic() - script_started)
+    per_render = max(0.1, remaining * 0.8 / render_count)
+    scene.cycles.use_adaptive_sampling = True
+    scene.cycles.adaptive_threshold = 0.1 if per_render < 2 else 0.05 if per_render < 10 else 0.01
+    scene.cycles.time_limit = per_render
+    scene.cycles.use_denoising = True
+    scene.cycles.denoiser = 'OPENIMAGEDENOISE'
+    print(f"Time budget: {per_render:.2f} s per render, noise threshold {scene.cycles.adaptive_threshold}")
+
+percentage = scene.render.resolution_percentage
+frame_width = int(resolution_x * percentage / 100)
+frame_height = int(resolution_y * percentage / 100)
+tile_rect = [0, 0, frame_width, frame_height]
+
+if threads:
+    scene.render.threads_mode = 'FIXED'
+    scene.render.threads = threads
+    print(f"Render threads: {threads}")
+
+# Tiled render: crop to this process's region (image rows counted from the top)
+if tile:
+    col, row, cols, rows = tile
+    x0, x1 = frame_width * col // cols, frame_width * (col + 1) // cols
+    y0, y1 = frame_height * row // rows, frame_height * (row + 1) // rows
+    tile_rect = [x0, y0, x1, y1]
+    scene.render.use_border = True
+    scene.render.use_crop_to_border = True
+    # Blender truncates border * size to pixels and measures y from the bottom
+    scene.render.border_min_x = (x0 + 0.5) / frame_width
+    scene.render.border_max_x = min(1.0, (x1 + 0.5) / frame_width)
+    scene.render.border_min_y = (frame_height - y1 + 0.5) / frame_height
+    scene.render.border_max_y = min(1.0, (frame_height - y0 + 0.5) / frame_height)
+    print(f"Render tile {col},{row} of {cols}x{rows}: {tile_rect}")
+
+plan = {
+    "count": render_count,
+    "width": tile_rect[2] - tile_rect[0],
+    "height": tile_rect[3] - tile_rect[1],
+    "frame_width": frame_width,
+    "frame_height": frame_height,
+    "tile_rect": tile_rect,
+}
+
+def render_layers_node(tree):
+    layers = next((n for n in tree.nodes if n.type == "R_LAYERS"), None)
+    if layers is None:
+        layers = tree.nodes.new("CompositorNodeRLayers")
+    return layers
+
+
+def view_colorspaces(scene):
+    """Resolve the scene's display view with OpenColorIO
+
+    Returns ((scene linear, view) colorspace names, None), or (None, reason) when the view cannot be
+    reproduced by a single colorspace conversion in the compositor.
+    """
+    view = scene.view_settings
+    if view.look != 'None':
+        return None, f"look '{view.look}'"
+    if view.use_curve_mapping:
+        return None, "curve mapping"
+    try:
+        import PyOpenColorIO as OCIO
+    except ImportError:
+        return None, "PyOpenColorIO is not available"
+    # Blender reads $OCIO when it is set, otherwise its bundled configuration
+    config_path = os.environ.get("OCIO") or os.path.join(
+        bpy.utils.resource_path('LOCAL'), "datafiles", "colormanagement", "config.ocio")
+    display = scene.display_settings.display_device
+    try:
+        config = OCIO.Config.CreateFromFile(config_path)
+        scene_linear = config.getColorSpace(OCIO.ROLE_SCENE_LINEAR)
+        # Views built from a view transform and a display colorspace have no single colorspace
+        if config.getDisplayViewTransformName(display, view.view_transform):
+            return None, f"view '{view.view_transform}' uses a view transform"
+        view_space = config.getDisplayViewColorSpaceName(display, view.view_transform)
+    except Exception as e:
+        return None, f"cannot read OCIO config {config_path}: {e}"
+    if scene_linear is None or not view_space or config.getColorSpace(view_space) is None:
+        return None, f"view '{view.view_transform}' of display '{display}' has no colorspace"
+    return (scene_linear.getName(), config.getColorSpace(view_space).getName()), None
+
+
+# Raw transfer: route the final image through the scene's view transform to a Viewer node and
+# copy its float pixels, so the result matches the image written in file mode
+raw_buffer = None
+raw_file = None
+if transfer_mode == "raw":
+    import numpy as np
+
+    raw_buffer = np.memmap(raw_path, dtype=np.float32, mode="w+",
+                           shape=(render_count, plan["height"], plan["width"], 3))
+    print(f"Raw transfer buffer: {raw_path}")
+    colorspaces, reason = view_colorspaces(scene)
+    if colorspaces is None:
+        # The compositor cannot apply this view: write a 16 bit PNG with the full color
+        # management and copy its pixels instead
+        raw_file = os.path.join(output_dir, "_raw_frame.png")
+        scene.render.image_settings.file_format = 'PNG'
+        scene.render.image_settings.color_depth = '16'
+        scene.render.image_settings.compression = 0
+        print(f"WARNING: Raw transfer falls back to a 16 bit PNG ({reason})", flush=True)
+    else:
+        scene.use_nodes = True
+        tree = scene.node_tree
+        viewer = tree.nodes.new("CompositorNodeViewer")
+        composite = next((n for n in tree.nodes if n.type == "COMPOSITE"), None)
+        if composite is not None and composite.inputs[0].is_linked:
+            source = composite.inputs[0].links[0].from_socket
+        else:
+            source = render_layers_node(tree).outputs["Image"]
+        if scene.view_settings.exposure:
+            exposure = tree.nodes.new("CompositorNodeExposure")
+            exposure.inputs[1].default_value = scene.view_settings.exposure
+            tree.links.new(source, exposure.inputs[0])
+            source = exposure.outputs[0]
+        convert = tree.nodes.new("CompositorNodeConvertColorSpace")
+        convert.from_color_space, convert.to_color_space = colorspaces
+        tree.links.new(source, convert.inputs[0])
+        tree.links.new(convert.outputs[0], viewer.inputs[0])
+        tree.nodes.active = viewer
+        print(f"Raw transfer view: {scene.view_settings.view_transform} ({colorspaces[1]})")
+
+
+def copy_raw_pixels(index):
+    if raw_file is None:
+        image = bpy.data.images["Viewer Node"]
+    else:
+        # Non-Color keeps the encoded values instead of converting them back to scene linear
+        image = bpy.data.images.load(raw_file)
+        image.colorspace_settings.is_data = True
+    width, height = image.size
+    if (height, width) != raw_buffer.shape[1:3]:
+        raise RuntimeError(f"Raw image size {width}x{height} does not match {plan['width']}x{plan['height']}")
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    if raw_file is not None:
+        bpy.data.images.remove(image)
+        os.remove(raw_file)
+    # Blender stores rows bottom-up; the view transform already encoded the values for display
+    rgb = np.clip(pixels.reshape(height, width, 4)[::-1, :, :3], 0.0, 1.0)
+    gamma = scene.view_settings.gamma
+    if raw_file is None and gamma != 1.0:
+        rgb = np.power(rgb, 1.0 / gamma)
+    raw_buffer[index] = rgb
+
 
+# Render passes: depth, normal and object index are written as float EXR by the compositor
+pass_buffers = None
+if render_passes:
+    import numpy as np
+
+    view_layer = bpy.context.view_layer
+    view_layer.use_pass_z = True
+    view_layer.use_pass_normal = True
+    # The object index pass only exists in Cycles; other engines derive the mask from depth
+    use_index_pass = scene.render.engine == 'CYCLES'
+    if use_index_pass:
+        view_layer.use_pass_object_index = True
+        for obj in scene.objects:
+            if obj.pass_index == 0:
+                obj.pass_index = 1
+
+    scene.use_nodes = True
+    tree = scene.node_tree
+    layers = render_layers_node(tree)
+    passes_dir = os.path.join(output_dir, "_passes")
+    file_output = tree.nodes.new("CompositorNodeOutputFile")
+    file_output.base_path = passes_dir
+    file_output.format.file_format = 'OPEN_EXR'
+    file_output.format.color_depth = '32'
+    file_output.file_slots.clear()
+    pass_sockets = {"depth": "Depth", "normal": "Normal"}
+    if use_index_pass:
+        pass_sockets["index"] = "IndexOB"
+    for slot_name, socket_name in pass_sockets.items():
+        file_output.file_slots.new(slot_name)
+        tree.links.new(layers.outputs[socket_name], file_output.inputs[slot_name])
+
+    count, height, width = plan["count"], plan["height"], plan["width"]
+    pass_buffers = {
+        "depth": np.memmap(pass_paths["depth"], dtype=np.float32, mode="w+", shape=(count, height, width)),
+        "normal": np.memmap(pass_paths["normal"], dtype=np.float32, mode="w+", shape=(count, height, width, 3)),
+        "mask": np.memmap(pass_paths["mask"], dtype=np.float32, mode="w+", shape=(count, height, width)),
+    }
+    print(f"Render passes: {', '.join(pass_sockets.values())}")
+
+
+def read_pass(slot_name):
+    path = max(glob.glob(os.path.join(passes_dir, f"{slot_name}*.exr")), key=os.path.getmtime)
+    image = bpy.data.images.load(path)
+    image.colorspace_settings.is_data = True
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    bpy.data.images.remove(image)
+    os.remove(path)
+    return pixels.reshape(height, width, 4)[::-1]
+
+
+def copy_passes(index, camera):
+    depth = read_pass("depth")[..., 0]
+    normal = read_pass("normal")[..., :3]
+    if use_index_pass:
+        mask = read_pass("index")[..., 0] > 0
+    else:
+        mask = depth < min(camera.data.clip_end, 1e9) * 0.999
+
+    # Depth: raw distance, background 0. The node normalizes it per frame, after stitching tiles,
+    # so every tile of a frame shares one near/far range
+    pass_buffers["depth"][index] = np.where(mask, depth, 0.0)
+
+    # Normal: world space to camera space, mapped to [0, 1]; background faces the camera
+    rotation = np.array(camera.matrix_world.to_3x3().normalized(), dtype=np.float32)
+    camera_normal = normal @ rotation
+    pass_buffers["normal"][index] = np.where(mask[..., None], camera_normal * 0.5 + 0.5, (0.5, 0.5, 1.0))
+    pass_buffers["mask"][index] = mask
+
+
+print("BL_RENDER_PLAN " + json.dumps(plan), flush=True)
+
+images = []
 try:
-    bpy.ops.render.render(write_still=True)
-    print(f"Render completed: {img_path}")
+    for frame in render_frames:
+        if frames:
+            scene.frame_set(frame)
+            print(f"Set frame: {frame}")
+        for camera in target_cameras:
+            scene.camera = camera
+            print(f"Set active camera: {camera.name}")
+
+            img_name = output_filename
+            if len(target_cameras) > 1:
+                img_name += f"_{bpy.path.clean_name(camera.name)}"
+            if frames:
+                img_name += f"_{frame:04d}"
+            print("BL_PHASE render_start", flush=True)
+            if raw_buffer is None:
+                img_path = os.path.join(output_dir, f"{img_name}.{image_format.lower()}")
+                scene.render.filepath = img_path
+                bpy.ops.render.render(write_still=True)
+            else:
+                img_path = None
+                if raw_file is None:
+                    bpy.ops.render.render()
+                else:
+                    scene.render.filepath = raw_file
+                    bpy.ops.render.render(write_still=True)
+                copy_raw_pixels(len(images))
+            if pass_buffers is not None:
+                copy_passes(len(images), camera)
+            print("BL_PHASE render_done", flush=True)
+            print(f"Render completed: {img_path or img_name}")
+            entry = {"index": len(images), "camera_name": camera.name, "frame": frame, "image_path": img_path}
+            images.append(entry)
+            print("BL_RENDER_IMAGE " + json.dumps(entry), flush=True)
+
     result = {
         "status": "success",
-        "image_path": img_path,
-        "camera_name": target_camera.name,
+        "image_path": images[0]["image_path"],
+        "camera_name": images[0]["camera_name"],
+        "images": images,
         "resolution": f"{resolution_x}x{resolution_y}",
         "format": image_format,
-        "engine": bpy.context.scene.render.engine
+        "engine": scene.render.engine
     }
 except Exception as e:
     print(f"Render failed: {e}")
     result = {"status": "error", "message": f"Render failed: {e}"}
+finally:
+    if raw_buffer is not None:
+        raw_buffer.flush()
+        del raw_buffer
+    if pass_buffers is not None:
+        for buffer in pass_buffers.values():
+            buffer.flush()
+        del pass_buffers
 
 # Output render results
 with open(os.path.join(output_dir, "render_result.json"), "w") as f:
     json.dump(result, f, indent=2)
-''' 
\ No newline at end of file
+'''
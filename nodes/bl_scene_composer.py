@@ -1,9 +1,30 @@
+import hashlib
 import json
 import os
-import subprocess
+import shutil
+import time
 import folder_paths
+import numpy as np
 
-from .blender_manager import BlenderManager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .blender_job import blender_job_dir, publish_file
+from .blender_output import LOG_LEVELS, BlenderLogCapture
+from .blender_worker_pool import BlenderWorkerError, run_blender_script
+from .disk_cache import DiskLRUCache, file_digest, params_digest
+from .scene_index import BLENDER_SCENE_INFO_FUNCTIONS, store_scene_info
+from .scene_description import SceneDescription
+from .scene_plan import ScenePlan, ScenePlanStep
+
+# 导入资产缓存：每个模型文件按内容哈希和导入选项转换为一次.blend库
+ASSET_CACHE = DiskLRUCache("assets", int(os.environ.get("BLENDER_ASSET_CACHE_MB", "8192")) * 1024 * 1024)
+# 导入方式变化时递增，使旧的缓存库失效
+_ASSET_IMPORT_VERSION = 1
+# 合成脚本打印的结果行前缀，写入节点日志
+_RESULT_PREFIXES = ("Composition: ", "Scattered ", "Triangles of ", "Scene triangles: ", "Textures: ")
+# 日志中最多逐个列出变换的模型数（verbose时全部列出）
+MAX_LOGGED_MODELS = 20
 
 class BL_Scene_Composer:
     @classmethod
@@ -17,20 +38,35 @@ class BL_Scene_Composer:
             },
             "optional": {
                 "blend_path": ("STRING", {"default": ""}),
+                "incremental": ("BOOLEAN", {"default": True}),
+                "use_asset_cache": ("BOOLEAN", {"default": True}),
+                "instance_duplicates": ("BOOLEAN", {"default": True}),
+                "defer": ("BOOLEAN", {"default": False}),
+                "save_blend": ("BOOLEAN", {"default": True}),
+                "import_workers": ("INT", {"default": 1, "min": 1, "max": 64}),
+                "log_level": (list(LOG_LEVELS), {"default": "summary"}),
+                "scene_triangle_budget": ("INT", {"default": 0, "min": 0, "max": 1000000000, "step": 1000}),
+                "dedupe_textures": ("BOOLEAN", {"default": True}),
+                "max_texture_size": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 256}),
+                "large_scene": ("BOOLEAN", {"default": False}),
+                "use_worker_pool": ("BOOLEAN", {"default": True}),
             },
             "hidden": {
                 "background_color": ("STRING", {"default": "white", "multiline": False}),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING",)
-    RETURN_NAMES = ("blend_path", "log",)
+    RETURN_TYPES = ("STRING", "STRING", "BLENDER_SCENE",)
+    RETURN_NAMES = ("blend_path", "log", "scene",)
     FUNCTION = "compose_scene"
     CATEGORY = "Blender"
     DESCRIPTION = "Compose 3D models into a Blender scene"
 
     def compose_scene(self, models, output_folder="blender", output_filename="scene", 
-                     blend_path="", background_color="white", use_full_path=True):
+                     blend_path="", background_color="white", use_full_path=True, incremental=True,
+                     use_asset_cache=True, instance_duplicates=True, defer=False, save_blend=True,
+                     import_workers=1, log_level="summary", scene_triangle_budget=0, dedupe_textures=True,
+                     max_texture_size=0, large_scene=False, use_worker_pool=True):
         # 初始化日志
         log_messages = []
         log_messages.append(f"Starting scene composition...")
@@ -40,18 +76,12 @@ class BL_Scene_Composer:
         if models is None:
             error_msg = "No models provided"
             log_messages.append(f"ERROR: {error_msg}")
-            return ("", "\n".join(log_messages))
-        
-        # 标准化模型列表
-        if isinstance(models, dict):
-            models_list = [models]
-        else:
-            models_list = models
+            return ("", "\n".join(log_messages), ScenePlan())
         
-        log_messages.append(f"Processing {len(models_list)} objects")
+        # 转换为结构数组形式的场景描述（兼容模型数据字典及其列表）
+        scene = SceneDescription.from_models(models)
         
-        # Path configuration
-        blender_bin = BlenderManager().get_blender_path()
+        log_messages.append(f"Processing {len(scene)} objects")
         
         # 获取ComfyUI输出目录
         output_dir = folder_paths.get_output_directory()
@@ -61,159 +91,291 @@ class BL_Scene_Composer:
         # 计算完整输出路径
         full_output_path = os.path.join(output_dir, f"{output_filename}.blend")
         
+        # 根据设置确定返回的路径格式
+        if use_full_path:
+            output_blend = full_output_path
+        else:
+            output_blend = f"{output_folder}/{output_filename}.blend"
+        
         # 确定输出blend文件路径
         if blend_path and blend_path.strip():
             # 检查源文件是否存在
             if not os.path.exists(blend_path):
                 error_msg = f"Source blend file not found: {blend_path}"
                 log_messages.append(f"ERROR: {error_msg}")
-                return ("", "\n".join(log_messages))
-            
-            # 复制源文件到输出目录
-            import shutil
-            try:
-                shutil.copy2(blend_path, full_output_path)
-                log_messages.append(f"Copied source blend file: {blend_path} -> {full_output_path}")
-            except Exception as e:
-                error_msg = f"Failed to copy blend file: {e}"
-                log_messages.append(f"ERROR: {error_msg}")
-                return ("", "\n".join(log_messages))
-            
-            # 根据设置确定返回的路径格式
-            if use_full_path:
-                output_blend = full_output_path
-            else:
-                output_blend = f"{output_folder}/{output_filename}.blend"
-            
-            log_messages.append(f"Using copied blend file: {output_blend}")
+                return ("", "\n".join(log_messages), ScenePlan())
+            log_messages.append(f"Using source blend file: {blend_path}")
             mode = "append"
         else:
-            # 根据设置确定返回的路径格式
-            if use_full_path:
-                output_blend = full_output_path
-            else:
-                output_blend = f"{output_folder}/{output_filename}.blend"
             log_messages.append(f"Creating new blend file: {output_blend}")
             mode = "create"
         
-        # 检查所有模型文件是否存在（跳过摄像机）
-        for model in models_list:
-            if model.get("type") != "camera" and not os.path.exists(model["file_path"]):
-                error_msg = f"Model file not found: {model['file_path']}"
+        # 检查所有模型文件是否存在（每个文件只检查一次）
+        for file_path in scene.paths:
+            if not os.path.exists(file_path):
+                error_msg = f"Model file not found: {file_path}"
                 log_messages.append(f"ERROR: {error_msg}")
-                return (output_blend, "\n".join(log_messages))
+                return (output_blend, "\n".join(log_messages), ScenePlan())
         
-        # 准备模型数据，确保浮点数格式正确
-        def format_float(value):
-            if isinstance(value, (list, tuple)):
-                return [format_float(v) for v in value]
-            elif isinstance(value, float):
-                return round(value, 6)  # 限制小数位数
-            return value
+        # 每个模型文件的信息（内容哈希只计算一次），按文件序号传给Blender脚本
+        files = [{"file_path": file_path, "file_format": file_format, "file_digest": file_digest(file_path)}
+                 for file_path, file_format in zip(scene.paths, scene.path_formats)]
         
-        formatted_models = []
-        for model in models_list:
-            if model.get("type") == "camera":
-                # 摄像机数据
-                formatted_model = {
-                    "type": "camera",
-                    "name": model["name"],
-                    "position": format_float(model["position"]),
-                    "rotation": format_float(model["rotation"]),
-                    "scale": format_float(model["scale"]),
-                    "collection_name": model["collection_name"],
-                    "focal_length": model["focal_length"]
-                }
-            else:
-                # 3D模型数据
-                formatted_model = {
-                    "type": "model",
-                    "file_path": model["file_path"],
-                    "position": format_float(model["position"]),
-                    "rotation": format_float(model["rotation"]),
-                    "scale": format_float(model["scale"]),
-                    "name": model["name"],
-                    "file_format": model.get("file_format", os.path.splitext(model["file_path"])[1].lower())
-                }
-            formatted_models.append(formatted_model)
-        
-        # 准备参数数据
-        params = {
-            "output_blend": output_blend,
-            "output_dir": output_dir,
-            "mode": mode,
-            "background_color": background_color,
-            "models_data": formatted_models
+        # 整个场景的选项，原样传给Blender脚本
+        scene_options = {
+            "scene_triangle_budget": scene_triangle_budget,
+            "dedupe_textures": dedupe_textures,
+            "max_texture_size": max_texture_size,
+            "large_scene": large_scene
         }
+        step = self._composition_step(scene, files, mode, blend_path, output_blend,
+                                      full_output_path, output_filename, background_color, incremental,
+                                      use_asset_cache, instance_duplicates, save_blend, import_workers,
+                                      log_level, scene_options)
         
-        # 将参数写入JSON文件
-        param_json_path = os.path.join(output_dir, f"{output_filename}_composer_params.json")
-        with open(param_json_path, "w", encoding="utf-8") as f:
-            json.dump(params, f, ensure_ascii=False, indent=2)
+        # 延迟执行：只返回场景计划，由下游的渲染或导出节点在同一个Blender会话中完成合成
+        if defer:
+            log_messages.append("Composition deferred to the downstream Render/Export node")
+            plan = ScenePlan(full_output_path if save_blend else "", [step], log_level)
+            return (output_blend, "\n".join(log_messages), plan)
         
-        # 准备Blender脚本内容
-        script_content = _BLENDER_COMPOSER_SCRIPT
+        # 每次合成使用独占的作业目录，Blender保存到作业目录后再原子地发布到输出路径
+        with blender_job_dir(output_dir, "compose") as job_dir:
+            try:
+                print(f"Executing composer script in: {job_dir}")
+                ScenePlan(steps=[step], log_level=log_level).execute(job_dir, [], log_messages,
+                                                                     use_pool=use_worker_pool)
+            except Exception as e:
+                log_messages.append(f"Blender call failed: {e}")
         
-        # 写入临时脚本文件
-        script_path = os.path.join(output_dir, f"{output_filename}_composer_script.py")
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(script_content)
+        plan = ScenePlan(full_output_path if os.path.exists(full_output_path) else "")
+        return (output_blend, "\n".join(log_messages), plan)
+    
+    def _composition_step(self, scene, files, mode, blend_path, output_blend, full_output_path,
+                          output_filename, background_color, incremental, use_asset_cache, instance_duplicates,
+                          save_blend, import_workers, log_level, scene_options):
+        """构造合成步骤：prepare在作业目录中准备参数，complete发布blend文件、缓存库和场景索引"""
+        asset_reservations = {}
+        import_notes = {}
         
-        # 调用Blender执行脚本
-        cmd = [blender_bin, "--background", "--factory-startup", "--python", script_path, "--", param_json_path]
-        try:
-            print(f"Executing command: {' '.join(cmd)}")
-
-            if os.name == 'nt':  # Windows
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=output_dir,
-                    shell=False,
-                    encoding='utf-8',
-                    errors='replace'
-                )
-            else:  # macOS and Linux
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=output_dir
-                )
-                
-            print(f"Return code: {result.returncode}")
-            print(f"Stdout: {result.stdout}")
-            if result.stderr:
-                print(f"Error: {result.stderr}")
-            if result.returncode != 0:
-                error_msg = f"Blender script execution failed(return code: {result.returncode}): {result.stderr}"
+        def prepare(job_dir):
+            job_blend = os.path.join(job_dir, f"{output_filename}.blend")
+            files_data = [dict(file_data) for file_data in files]
+            
+            # 场景描述写成二进制.npz，Blender脚本直接读取数组
+            scene_path = os.path.join(job_dir, f"{output_filename}_scene.npz")
+            scene.save(scene_path)
+            
+            # 复制源文件到作业目录
+            if mode == "append":
+                shutil.copy2(blend_path, job_blend)
+            
+            # 资产缓存：命中时直接追加缓存库，未命中时由Blender在导入后写出缓存库
+            reservations = []
+            if use_asset_cache:
+                for file_data in files_data:
+                    asset_key = params_digest(file_data["file_digest"], file_data["file_format"],
+                                              _ASSET_IMPORT_VERSION)
+                    cached_path = ASSET_CACHE.get(asset_key, ".blend")
+                    if cached_path is not None:
+                        file_data["asset_cache"] = cached_path
+                    else:
+                        tmp_path = ASSET_CACHE.reserve(asset_key, ".blend")
+                        file_data["asset_cache_store"] = tmp_path
+                        reservations.append((asset_key, tmp_path))
+            
+            hits = sum(1 for file_data in files_data if "asset_cache" in file_data)
+            asset_reservations[job_dir] = (hits, reservations)
+            
+            # 并行导入：未命中的模型文件先由多个独立Blender进程各自转换为.blend库，最终合成只需追加
+            if import_workers > 1:
+                pending = {}
+                for file_data in files_data:
+                    if "asset_cache" not in file_data:
+                        source_id = (file_data["file_digest"], file_data["file_format"])
+                        pending.setdefault(source_id, []).append(file_data)
+                if len(pending) > 1:
+                    import_notes[job_dir] = _parallel_import(list(pending.values()), job_dir, import_workers)
+            
+            # 增量合成：上一次的输出若基于同一源文件和相同的场景选项，只重新导入新增或内容变化的模型
+            previous_blend = None
+            if incremental and os.path.exists(full_output_path):
+                previous_blend = full_output_path
+            
+            return {
+                "output_blend": job_blend,
+                "output_dir": job_dir,
+                "mode": mode,
+                "background_color": background_color,
+                "scene_path": scene_path,
+                "files": files_data,
+                "instance_digests": {str(row): _arrays_digest(arrays) for row, arrays in scene.instances.items()},
+                "previous_blend": previous_blend,
+                "source_key": file_digest(blend_path) if mode == "append" else "",
+                "instance_duplicates": instance_duplicates,
+                "save_blend": save_blend,
+                "log_level": log_level,
+                **scene_options
+            }
+        
+        def complete(job_dir, returncode, output, log_messages):
+            # 发布Blender写出的缓存库，删除未使用的临时文件
+            hits, reservations = asset_reservations.pop(job_dir, (0, []))
+            if use_asset_cache:
+                log_messages.append(f"Asset cache: {hits} hit(s), {len(reservations)} miss(es)")
+            log_messages.extend(import_notes.pop(job_dir, []))
+            for asset_key, tmp_path in reservations:
+                try:
+                    if os.path.getsize(tmp_path) > 0:
+                        ASSET_CACHE.commit(asset_key, ".blend", tmp_path)
+                    else:
+                        os.remove(tmp_path)
+                except OSError:
+                    ASSET_CACHE.discard(tmp_path)
+            
+            print(f"Return code: {returncode}")
+            if returncode != 0:
+                error_msg = f"Blender script execution failed(return code: {returncode})"
                 log_messages.append(f"ERROR: {error_msg}")
-                return (output_blend, "\n".join(log_messages))
-                
-            log_messages.append(f"Blender scene composition successful: {output_blend}")
-            log_messages.append(f"Full path: {full_output_path}")
+                log_messages.extend(output.summary())
+                return
+            for prefix in _RESULT_PREFIXES:
+                log_messages.extend(output.find(prefix))
+            log_messages.extend(output.summary(tail=0 if log_level == "quiet" else 20))
             
-            # 添加处理信息到日志
-            for model in models_list:
-                log_messages.append(f"Model: {model['name']}")
-                log_messages.append(f"  Position: {model['position']}")
-                log_messages.append(f"  Rotation: {model['rotation']}")
-                log_messages.append(f"  Scale: {model['scale']}")
+            if save_blend:
+                # 原子地发布blend文件
+                job_blend = os.path.join(job_dir, f"{output_filename}.blend")
+                publish_file(job_blend, full_output_path)
+                log_messages.append(f"Blender scene composition successful: {output_blend}")
+                log_messages.append(f"Full path: {full_output_path}")
+                
+                # 把合成脚本导出的场景信息写入索引，后续节点无需再启动Blender查询
+                try:
+                    with open(os.path.join(job_dir, "scene_info.json"), "r", encoding="utf-8") as f:
+                        store_scene_info(full_output_path, json.load(f))
+                except Exception as e:
+                    log_messages.append(f"WARNING: Failed to index scene: {e}")
+            else:
+                log_messages.append("Blender scene composition successful (blend file not saved)")
             
-        except Exception as e:
-            log_messages.append(f"Blender call failed: {e}")
-            return (output_blend, "\n".join(log_messages))
+            # 添加处理信息到日志，大场景只列出前几个模型
+            logged = len(scene) if log_level == "verbose" else min(len(scene), MAX_LOGGED_MODELS)
+            for record in islice(scene, logged):
+                log_messages.append(f"Model: {record.name}")
+                log_messages.append(f"  Position: {record.position}")
+                log_messages.append(f"  Rotation: {record.rotation}")
+                log_messages.append(f"  Scale: {record.scale}")
+            if len(scene) > logged:
+                log_messages.append(f"... and {len(scene) - logged} more models")
         
-        return (output_blend, "\n".join(log_messages))
+        return ScenePlanStep("compose", BLENDER_SCENE_INFO_FUNCTIONS + _BLENDER_COMPOSER_SCRIPT,
+                             f"{output_filename}_composer_params.json", prepare, complete, _RESULT_PREFIXES)
+
+def _arrays_digest(arrays):
+    """按名称排序后对数组内容求哈希"""
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype}:{array.shape}".encode("utf-8"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _parallel_import(groups, job_dir, workers):
+    """在多个独立Blender进程中并行导入模型文件，每个文件写出一个.blend库
+
+    groups 为按模型文件分组的文件数据；成功的组改为从写出的库追加。返回日志行。
+    """
+    def convert(index):
+        group = groups[index]
+        # 启用资产缓存时直接写入缓存预留的临时文件，由合成完成后统一发布
+        output_path = group[0].get("asset_cache_store") or os.path.join(job_dir, f"_import_{index}.blend")
+        param_json_path = os.path.join(job_dir, f"_import_{index}_import_params.json")
+        with open(param_json_path, "w", encoding="utf-8") as f:
+            json.dump({"file_path": group[0]["file_path"], "file_format": group[0]["file_format"],
+                       "output_path": output_path}, f, ensure_ascii=False)
+        output = BlenderLogCapture(tail_lines=20, echo=False)
+        try:
+            returncode = run_blender_script(script_path, [param_json_path], cwd=job_dir,
+                                            on_line=output.feed, use_pool=False)
+        except BlenderWorkerError as e:
+            return f"WARNING: Parallel import failed for {group[0]['file_path']}: {e}"
+        if returncode != 0 or not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            tail = " | ".join(list(output.tail)[-3:])
+            return f"WARNING: Parallel import failed for {group[0]['file_path']}: {tail}"
+        for model_data in group:
+            model_data.pop("asset_cache_store", None)
+            model_data["asset_cache"] = output_path
+        return None
+
+    script_path = os.path.join(job_dir, "_import_script.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(_BLENDER_IMPORT_SCRIPT)
+
+    start = time.perf_counter()
+    workers = min(workers, len(groups))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        failures = [message for message in executor.map(convert, range(len(groups))) if message]
+    notes = [f"Parallel import: {len(groups) - len(failures)}/{len(groups)} file(s) in "
+             f"{time.perf_counter() - start:.2f} s with {workers} processes"]
+    return notes + failures
+
+
+# Blender model import script: converts one model file into a .blend library
+_BLENDER_IMPORT_SCRIPT = r'''
+import bpy
+import sys
+import json
+
+param_json = next((arg for arg in sys.argv if arg.endswith("_import_params.json")), None)
+if not param_json:
+    print("No param json found!")
+    sys.exit(1)
+
+with open(param_json, "r", encoding="utf-8") as f:
+    params = json.load(f)
+
+file_path = params["file_path"]
+file_format = params["file_format"]
+
+bpy.ops.wm.read_factory_settings(use_empty=True)
+try:
+    if file_format in ['.glb', '.gltf']:
+        bpy.ops.import_scene.gltf(filepath=file_path)
+    elif file_format == '.fbx':
+        bpy.ops.import_scene.fbx(filepath=file_path)
+    elif file_format == '.obj':
+        # Blender 4.x removed the legacy OBJ importer
+        if hasattr(bpy.ops.wm, "obj_import"):
+            bpy.ops.wm.obj_import(filepath=file_path)
+        else:
+            bpy.ops.import_scene.obj(filepath=file_path)
+    else:
+        print(f"Unsupported file format: {file_format}")
+        sys.exit(1)
+except Exception as e:
+    print(f"Error importing {file_format} file {file_path}: {e}")
+    sys.exit(1)
+
+objects = set(bpy.context.scene.objects)
+if not objects:
+    print(f"No objects imported from {file_path}")
+    sys.exit(1)
+bpy.data.libraries.write(params["output_path"], objects, path_remap='ABSOLUTE')
+print(f"Imported {len(objects)} objects from {file_path}")
+'''
+
 
 # Blender scene composition script
 _BLENDER_COMPOSER_SCRIPT = r'''
 import bpy
 import sys
 import os
+import re
 import json
+import hashlib
 import math
+import numpy as np
 
 # Get parameters from command line arguments
 param_json = None
@@ -236,11 +398,82 @@ output_blend = params["output_blend"]
 output_dir = params["output_dir"]
 mode = params["mode"]
 background_color = params["background_color"]
-models_data = params["models_data"]
+files = params["files"]
+instance_digests = params.get("instance_digests", {})
+previous_blend = params.get("previous_blend")
+source_key = params.get("source_key", "")
+instance_duplicates = params.get("instance_duplicates", True)
+# Per-object messages are only printed at the verbose log level
+verbose = params.get("log_level", "summary") == "verbose"
+scene_triangle_budget = params.get("scene_triangle_budget", 0)
+dedupe_textures = params.get("dedupe_textures", True)
+max_texture_size = params.get("max_texture_size", 0)
+# Large-scene mode: importers write straight into the target collection and nothing scans the whole scene
+large_scene = params.get("large_scene", False)
+
+# Scene description: struct-of-arrays written by the node, one row per model, camera or scatter
+KINDS = ("model", "camera", "scatter")
+scene_arrays = np.load(params["scene_path"])
+scene_kinds = scene_arrays["kinds"].tolist()
+scene_names = scene_arrays["names"].tolist()
+scene_collections = scene_arrays["collections"].tolist()
+collection_index = scene_arrays["collection_index"].tolist()
+path_index = scene_arrays["path_index"].tolist()
+row_max_triangles = scene_arrays["max_triangles"].tolist()
+focal_lengths = scene_arrays["focal_lengths"].tolist()
+transforms = scene_arrays["transforms"]
+# Position, rotation and scale per row, rounded to the precision the manifest compares
+transform_lists = np.round(transforms.astype(np.float64), 6).reshape(-1, 3, 3).tolist()
+
+def row_data(row):
+    """Model data of one row of the scene description"""
+    kind = KINDS[scene_kinds[row]]
+    position, rotation, scale = transform_lists[row]
+    model_data = {"row": row, "type": kind, "name": scene_names[row], "position": position,
+                  "rotation": rotation, "scale": scale,
+                  "collection_name": scene_collections[collection_index[row]]}
+    if kind == "camera":
+        model_data["focal_length"] = focal_lengths[row]
+    else:
+        model_data.update(files[path_index[row]], max_triangles=row_max_triangles[row])
+    if kind == "scatter":
+        model_data["instances_digest"] = instance_digests[str(row)]
+    return model_data
 
-# Initialize Blender scene
+# Incremental composition: reuse the previous output when it was built from the same source.
+# Decimation and downscaled, packed textures change the reused data in place, so the scene-wide
+# options are part of the source too and any change forces a full rebuild. Reused linked
+# duplicates keep sharing mesh data, and large-scene mode uses another collection layout, so
+# changing either option rebuilds as well.
+MANIFEST_KEY = "bl_composer_manifest"
+composition_source = {
+    "source_key": source_key,
+    "scene_triangle_budget": scene_triangle_budget,
+    "dedupe_textures": dedupe_textures,
+    "max_texture_size": max_texture_size,
+    "instance_duplicates": instance_duplicates,
+    "large_scene": large_scene,
+}
+manifest_entries = {}
+reuse_previous = False
+if previous_blend:
+    try:
+        bpy.ops.wm.open_mainfile(filepath=previous_blend)
+        manifest = json.loads(bpy.context.scene.get(MANIFEST_KEY, "{}"))
+        if manifest.get("source") == composition_source:
+            manifest_entries = manifest.get("entries", {})
+            reuse_previous = True
+            print(f"Loaded previous scene with {len(manifest_entries)} manifest entries: {previous_blend}")
+        else:
+            print("Previous scene was built from a different source or with other scene options, rebuilding")
+    except Exception as e:
+        print(f"Error loading previous scene: {e}")
+
+# Initialize Blender scene (unless the previous scene is reused)
 try:
-    if mode == "create":
+    if reuse_previous:
+        print("Reusing previous scene")
+    elif mode == "create":
         # Create new empty scene
         bpy.ops.wm.read_factory_settings(use_empty=True)
         bpy.context.scene.unit_settings.system = 'METRIC'
@@ -262,188 +495,733 @@ except Exception as e:
     print(f"Error initializing Blender scene: {e}")
     sys.exit(1)
 
+# Collection names in use and the next numeric suffix per base name, so that a unique
+# name is found without probing bpy.data.collections once per existing duplicate
+collection_names = {collection.name for collection in bpy.data.collections}
+collection_counters = {}
+
 # Function to get unique collection name
 def get_unique_collection_name(base_name):
-    if base_name not in bpy.data.collections:
+    if base_name not in collection_names:
+        collection_names.add(base_name)
         return base_name
     
-    counter = 1
-    while f"{base_name}_{counter}" in bpy.data.collections:
+    counter = collection_counters.get(base_name, 1)
+    while f"{base_name}_{counter}" in collection_names:
         counter += 1
+    collection_counters[base_name] = counter + 1
     
-    return f"{base_name}_{counter}"
+    unique_name = f"{base_name}_{counter}"
+    collection_names.add(unique_name)
+    return unique_name
 
-# Import all 3D models and create cameras
-total_imported = 0
-for model_data in models_data:
+# Large-scene mode: the collection created in this run for each collection name
+shared_collections = {}
+
+def get_target_collection(collection_name, shared=None):
+    # Large-scene mode puts every placement with the same collection name into one collection
+    if shared is None:
+        shared = large_scene
+    if shared and collection_name in shared_collections:
+        return shared_collections[collection_name]
+    
+    # Get unique collection name
+    unique_collection_name = get_unique_collection_name(collection_name)
+    
+    # Create collection (the name is unique, so no existing collection is ever reused)
+    target_collection = bpy.data.collections.new(unique_collection_name)
+    bpy.context.scene.collection.children.link(target_collection)
+    print(f"Created new collection: {unique_collection_name}")
+    if shared:
+        shared_collections[collection_name] = target_collection
+    return target_collection
+
+def normalize_rotation(angle_degrees):
+    """Convert degrees to radians and normalize to -π to π range"""
+    angle_rad = math.radians(angle_degrees)
+    # Normalize to -π to π range
+    while angle_rad > math.pi:
+        angle_rad -= 2 * math.pi
+    while angle_rad < -math.pi:
+        angle_rad += 2 * math.pi
+    return angle_rad
+
+def apply_transform(obj, position, rotation, scale=None):
+    obj.location = position
+    # Ensure rotation mode is set to XYZ Euler
+    obj.rotation_mode = 'XYZ'
+    obj.rotation_euler = tuple(normalize_rotation(angle) for angle in rotation)
+    if scale is not None:
+        obj.scale = scale
+
+# New containers get their transforms in one pass after all rows are placed
+pending_transforms = []
+
+def place(obj, model_data):
+    """Set the transform of a new object, deferred when it comes from a row of the scene description"""
+    row = model_data.get("row")
+    if row is None:
+        apply_transform(obj, model_data["position"], model_data["rotation"], model_data["scale"])
+    else:
+        pending_transforms.append((obj, row))
+
+def apply_pending_transforms():
+    """Write the deferred transforms after converting the angles of all rows at once"""
+    if not pending_transforms:
+        return
+    rows = np.array([row for _, row in pending_transforms])
+    values = transforms[rows].astype(np.float64)
+    # Degrees to radians in the -pi..pi range, as normalize_rotation does per angle
+    values[:, 3:6] = (np.radians(values[:, 3:6]) + math.pi) % (2 * math.pi) - math.pi
+    
+    # Only the pending objects are written. foreach_set would need every object in bpy.data.objects,
+    # including the objects of an appended source blend and library-linked objects.
+    failed = 0
+    for (obj, row), (location, rotation, scale) in zip(pending_transforms, values.reshape(-1, 3, 3).tolist()):
+        try:
+            obj.location = location
+            obj.rotation_mode = 'XYZ'
+            obj.rotation_euler = rotation
+            obj.scale = scale
+        except (AttributeError, TypeError, ReferenceError) as e:
+            failed += 1
+            if failed <= 10:
+                print(f"Warning: Could not set transform of row {row}: {e}")
+    if failed:
+        print(f"Warning: Transforms of {failed} object(s) could not be set")
+    pending_transforms.clear()
+    # Later steps read matrix_world and bounds in this session, so refresh them now
+    bpy.context.view_layer.update()
+
+def create_camera(model_data):
+    name = model_data["name"]
+    focal_length = model_data["focal_length"]
+    
+    print(f"Creating camera: {name}")
+    target_collection = get_target_collection(model_data["collection_name"])
+    
+    # Create camera data
+    camera_data = bpy.data.cameras.new(name=name)
+    camera_data.lens = focal_length
+    
+    # Create camera object
+    camera_obj = bpy.data.objects.new(name, camera_data)
+    target_collection.objects.link(camera_obj)
+    
+    # Apply position and rotation to camera
+    apply_transform(camera_obj, model_data["position"], model_data["rotation"])
+    
+    print(f"Created camera '{name}' with focal length {focal_length}mm at position {model_data['position']} with rotation {model_data['rotation']}")
+    return camera_obj, target_collection, 1
+
+def load_asset_library(path):
+    """Append every object of a cached asset library (not yet linked to the scene)"""
+    with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+        data_to.objects = list(data_from.objects)
+    return {obj for obj in data_to.objects if obj is not None}
+
+# View layer entries by collection name; children.get() is a linear search
+layer_collections = {}
+
+def layer_collection_of(collection):
+    """View layer entry of a collection linked directly to the scene collection"""
+    layer_collection = layer_collections.get(collection.name)
+    if layer_collection is None:
+        layer_collection = bpy.context.view_layer.layer_collection.children.get(collection.name)
+        if layer_collection is not None:
+            layer_collections[collection.name] = layer_collection
+    return layer_collection
+
+# Large-scene mode: importers write into this empty collection, so new objects are simply its contents
+staging_collection = None
+
+def get_staging_collection():
+    global staging_collection
+    if staging_collection is None:
+        staging_collection = bpy.data.collections.new("_import_staging")
+        bpy.context.scene.collection.children.link(staging_collection)
+    return staging_collection
+
+def remove_staging_collection():
+    global staging_collection
+    if staging_collection is not None:
+        bpy.data.collections.remove(staging_collection)
+        staging_collection = None
+
+def import_file(model_data, target_collection=None):
+    """Import a model file (or its cached library) and return the new objects
+
+    With a target collection (large-scene mode) the importer writes into an empty staging
+    collection and the objects are moved to the target, instead of being found by comparing
+    scene snapshots.
+    """
+    model_file_path = model_data["file_path"]
+    file_format = model_data.get("file_format", "")
+    
+    asset_cache = model_data.get("asset_cache")
+    if asset_cache:
+        try:
+            new_objects = load_asset_library(asset_cache)
+            if target_collection is not None:
+                for obj in new_objects:
+                    target_collection.objects.link(obj)
+            print(f"Loaded {len(new_objects)} objects from asset cache: {asset_cache}")
+            return new_objects
+        except Exception as e:
+            print(f"Error loading asset cache {asset_cache}: {e}")
+    
+    # Record objects before import, unless the importer writes into the empty staging collection
+    staging = get_staging_collection() if target_collection is not None else None
+    layer_collection = layer_collection_of(staging) if staging is not None else None
+    if layer_collection is not None:
+        view_layer = bpy.context.view_layer
+        previous_active = view_layer.active_layer_collection
+        view_layer.active_layer_collection = layer_collection
+    else:
+        objects_before = set(bpy.context.scene.objects)
+    
+    # Import model based on file format
     try:
-        object_type = model_data.get("type", "model")
-        position = model_data["position"]
-        rotation = model_data["rotation"]
-        scale = model_data["scale"]
-        name = model_data["name"]
-        
-        if object_type == "camera":
-            # Create camera
-            focal_length = model_data["focal_length"]
-            collection_name = model_data["collection_name"]
-            
-            print(f"Creating camera: {name}")
-            
-            # Get unique collection name
-            unique_collection_name = get_unique_collection_name(collection_name)
-            
-            # Create or get collection
-            if unique_collection_name in bpy.data.collections:
-                target_collection = bpy.data.collections[unique_collection_name]
-                print(f"Using existing collection: {unique_collection_name}")
+        if file_format in ['.glb', '.gltf']:
+            bpy.ops.import_scene.gltf(filepath=model_file_path)
+        elif file_format == '.fbx':
+            bpy.ops.import_scene.fbx(filepath=model_file_path)
+        elif file_format == '.obj':
+            # Blender 4.x removed the legacy OBJ importer
+            if hasattr(bpy.ops.wm, "obj_import"):
+                bpy.ops.wm.obj_import(filepath=model_file_path)
             else:
-                target_collection = bpy.data.collections.new(unique_collection_name)
-                bpy.context.scene.collection.children.link(target_collection)
-                print(f"Created new collection: {unique_collection_name}")
-            
-            # Create camera data
-            camera_data = bpy.data.cameras.new(name=name)
-            camera_data.lens = focal_length
-            
-            # Create camera object
-            camera_obj = bpy.data.objects.new(name, camera_data)
-            target_collection.objects.link(camera_obj)
-            
-            # Apply position and rotation to camera
-            camera_obj.location = position
-            
-            # Set rotation using XYZ Euler (convert degrees to radians)
-            def normalize_rotation(angle_degrees):
-                """Convert degrees to radians and normalize to -π to π range"""
-                angle_rad = math.radians(angle_degrees)
-                # Normalize to -π to π range
-                while angle_rad > math.pi:
-                    angle_rad -= 2 * math.pi
-                while angle_rad < -math.pi:
-                    angle_rad += 2 * math.pi
-                return angle_rad
-            
-            # Calculate normalized rotations
-            x_rot = normalize_rotation(rotation[0])
-            y_rot = normalize_rotation(rotation[1])
-            z_rot = normalize_rotation(rotation[2])
-            
-            # Ensure rotation mode is set to XYZ Euler
-            camera_obj.rotation_mode = 'XYZ'
-            camera_obj.rotation_euler = (x_rot, y_rot, z_rot)
-            
-            print(f"Created camera '{name}' with focal length {focal_length}mm at position {position} with rotation {rotation}")
-            total_imported += 1
-            
+                bpy.ops.import_scene.obj(filepath=model_file_path)
         else:
-            # Import 3D model
-            model_file_path = model_data["file_path"]
-            file_format = model_data.get("file_format", "")
-            collection_name = model_data.get("collection_name", "3D_Model")
-            
-            print(f"Importing {file_format.upper()} model: {name}")
-            
-            # Get unique collection name
-            unique_collection_name = get_unique_collection_name(collection_name)
+            print(f"Unsupported file format: {file_format}")
+            return None
+    except Exception as e:
+        print(f"Error importing {file_format} file {model_file_path}: {e}")
+        return None
+    finally:
+        if layer_collection is not None:
+            view_layer.active_layer_collection = previous_active
+
+    # Get newly imported objects
+    if layer_collection is not None:
+        new_objects = set(staging.objects)
+        for obj in new_objects:
+            target_collection.objects.link(obj)
+            staging.objects.unlink(obj)
+    else:
+        new_objects = set(bpy.context.scene.objects) - objects_before
+    
+    # Save the freshly imported objects as a library for later compositions
+    asset_cache_store = model_data.get("asset_cache_store")
+    if asset_cache_store and new_objects:
+        try:
+            bpy.data.libraries.write(asset_cache_store, new_objects, path_remap='ABSOLUTE')
+            print(f"Stored asset cache: {asset_cache_store}")
+        except Exception as e:
+            print(f"Error storing asset cache {asset_cache_store}: {e}")
+    return new_objects
+
+def import_model(model_data):
+    name = model_data["name"]
+    position = model_data["position"]
+    rotation = model_data["rotation"]
+    scale = model_data["scale"]
+    file_format = model_data.get("file_format", "")
+    
+    print(f"Importing {file_format.upper()} model: {name}")
+    target_collection = get_target_collection(model_data.get("collection_name", "3D_Model"),
+                                              shared=large_scene and not model_data.get("own_collection"))
+    
+    new_objects = import_file(model_data, target_collection if large_scene else None)
+    if new_objects is None:
+        return None
+    
+    # Find root objects (objects without parents or with parents not in the new objects)
+    root_objects = []
+    for obj in new_objects:
+        if obj.type in ['MESH', 'EMPTY', 'ARMATURE']:
+            # Check if this is a root object
+            is_root = True
+            if obj.parent is not None:
+                # If parent is also in new_objects, this is not a root
+                if obj.parent in new_objects:
+                    is_root = False
             
-            # Create or get collection
-            if unique_collection_name in bpy.data.collections:
-                target_collection = bpy.data.collections[unique_collection_name]
-                print(f"Using existing collection: {unique_collection_name}")
+            if is_root:
+                root_objects.append(obj)
+    
+    print(f"Found {len(root_objects)} root objects from {name} (total {len(new_objects)} objects)")
+    
+    # Create a parent Empty object to contain all imported objects as a group
+    parent_empty = bpy.data.objects.new(f"{name}_container", None)
+    parent_empty.empty_display_type = 'ARROWS'
+    target_collection.objects.link(parent_empty)
+
+    # Set parent empty transformations
+    place(parent_empty, model_data)
+
+    print(f"Created parent container '{parent_empty.name}' with transformations: pos{position} rot{rotation} scale{scale}")
+
+    # Large-scene mode: the objects are already in the target collection, only parent them
+    if large_scene:
+        for obj in new_objects:
+            obj.parent = parent_empty
+    
+    # Parent all new_objects to container, and restore hidden state
+    for obj in (() if large_scene else new_objects):
+        # Save original hidden state
+        original_hide_viewport = obj.hide_viewport
+        original_hide_render = obj.hide_render
+        original_hide_set = obj.hide_set
+
+        # Move to target collection
+        for collection in obj.users_collection:
+            collection.objects.unlink(obj)
+        target_collection.objects.link(obj)
+
+        # parent to container
+        obj.parent = parent_empty
+
+        # Restore hidden state
+        obj.hide_viewport = original_hide_viewport
+        obj.hide_render = original_hide_render
+        obj.hide_set = original_hide_set
+
+        if verbose:
+            print(f"Parented {obj.name} to container '{parent_empty.name}' (hidden: {original_hide_viewport})")
+    
+    # Per-model triangle budget: pick a fitting LOD if the file has any, then decimate the rest
+    max_triangles = model_data.get("max_triangles", 0)
+    root_count = len(root_objects)
+    if max_triangles:
+        root_names = {obj.name for obj in root_objects}
+        new_objects = select_lod(new_objects, max_triangles)
+        root_count = sum(1 for obj in new_objects if obj.name in root_names)
+        before, after = decimate_objects(new_objects, max_triangles)
+        print(f"Triangles of {name}: {before} -> {after} (budget {max_triangles})")
+    
+    # Recorded after LOD selection, so duplicates never copy the deleted levels
+    if large_scene:
+        container_objects[parent_empty.name] = (list(new_objects), root_count)
+    
+    return parent_empty, target_collection, root_count
+
+def group_by_mesh(objects):
+    """Mesh objects grouped by the mesh datablock they share"""
+    groups = {}
+    for obj in objects:
+        if obj.type == 'MESH':
+            groups.setdefault(obj.data, []).append(obj)
+    return groups
+
+def count_triangles(objects, weights=None):
+    """Triangles of the evaluated meshes (modifiers included)
+
+    Each mesh is evaluated once and counted for every object using it; weights maps an
+    object to how many times it is drawn (default once).
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    total = 0
+    for mesh_objects in group_by_mesh(objects).values():
+        mesh = mesh_objects[0].evaluated_get(depsgraph).data
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        uses = sum(weights.get(obj, 1) for obj in mesh_objects) if weights else len(mesh_objects)
+        total += (int(loop_totals.sum()) - 2 * len(loop_totals)) * uses
+    return total
+
+def drawn_counts():
+    """How many times every object is drawn: once when it is in the view layer, plus once per scatter point"""
+    view_layer_objects = list(bpy.context.view_layer.objects)
+    counts = {obj: 1 for obj in view_layer_objects}
+    for obj in view_layer_objects:
+        if obj.type != 'MESH':
+            continue
+        for modifier in obj.modifiers:
+            if modifier.type != 'NODES' or modifier.node_group is None:
+                continue
+            for node in modifier.node_group.nodes:
+                if node.bl_idname != 'GeometryNodeCollectionInfo':
+                    continue
+                collection = node.inputs["Collection"].default_value
+                for source in (collection.all_objects if collection else ()):
+                    counts[source] = counts.get(source, 0) + len(obj.data.vertices)
+    return counts
+
+LOD_NAME_RE = re.compile(r"^(.*?)[_.\- ]?LOD(\d+)(\.\d+)?$", re.IGNORECASE)
+
+def select_lod(objects, budget):
+    """Keep the finest LOD level (objects named *_LOD<n>) that fits the budget, delete the other levels"""
+    lods = {}
+    for obj in objects:
+        match = LOD_NAME_RE.match(obj.name)
+        if obj.type == 'MESH' and match:
+            lods.setdefault(match.group(1), {})[int(match.group(2))] = obj
+    lods = {base: variants for base, variants in lods.items() if len(variants) > 1}
+    if not lods:
+        return list(objects)
+    
+    lod_objects = {obj for variants in lods.values() for obj in variants.values()}
+    fixed = [obj for obj in objects if obj not in lod_objects]
+    levels = sorted({level for variants in lods.values() for level in variants})
+    for level in levels:
+        chosen = []
+        for variants in lods.values():
+            finer = [l for l in variants if l <= level]
+            chosen.append(variants[max(finer)] if finer else variants[min(variants)])
+        if count_triangles(fixed + chosen) <= budget:
+            break
+    for obj in lod_objects.difference(chosen):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    print(f"Selected LOD {level} for {len(lods)} object(s)")
+    return fixed + chosen
+
+def decimate_objects(objects, budget, weights=None):
+    """Decimate meshes to fit a triangle budget, returns (before, after) triangle counts
+
+    Meshes used only by these objects, none of which has modifiers, are decimated once and
+    the result is shared; the rest keep a live Decimate modifier per object so armatures and
+    shared data stay intact. An earlier budget modifier is tightened instead of stacking another.
+    """
+    groups = group_by_mesh(objects)
+    before = count_triangles(objects, weights)
+    if budget <= 0 or before <= budget:
+        return before, before
+    
+    ratio = max(0.0001, budget / before)
+    applied = []
+    for mesh, mesh_objects in groups.items():
+        # Point clouds carrying scatter instances have no faces of their own
+        if not mesh.polygons:
+            continue
+        if mesh.users == len(mesh_objects) and not any(obj.modifiers for obj in mesh_objects):
+            modifier = mesh_objects[0].modifiers.new("Triangle budget", 'DECIMATE')
+            modifier.ratio = ratio
+            applied.append((mesh, mesh_objects))
+            continue
+        for obj in mesh_objects:
+            modifier = obj.modifiers.get("Triangle budget")
+            if modifier is not None and modifier.type == 'DECIMATE':
+                modifier.ratio = max(0.0001, modifier.ratio * ratio)
             else:
-                target_collection = bpy.data.collections.new(unique_collection_name)
-                bpy.context.scene.collection.children.link(target_collection)
-                print(f"Created new collection: {unique_collection_name}")
-            
-            # Record objects before import
-            objects_before = set(bpy.context.scene.objects)
-            
-            # Import model based on file format
-            try:
-                if file_format in ['.glb', '.gltf']:
-                    bpy.ops.import_scene.gltf(filepath=model_file_path)
-                elif file_format == '.fbx':
-                    bpy.ops.import_scene.fbx(filepath=model_file_path)
-                elif file_format == '.obj':
-                    bpy.ops.import_scene.obj(filepath=model_file_path)
+                modifier = obj.modifiers.new("Triangle budget", 'DECIMATE')
+                modifier.ratio = ratio
+    
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    for old_mesh, mesh_objects in applied:
+        source = mesh_objects[0]
+        new_mesh = bpy.data.meshes.new_from_object(source.evaluated_get(depsgraph), preserve_all_data_layers=True,
+                                                   depsgraph=depsgraph)
+        source.modifiers.remove(source.modifiers[-1])
+        for obj in mesh_objects:
+            obj.data = new_mesh
+        mesh_name = old_mesh.name
+        bpy.data.meshes.remove(old_mesh)
+        new_mesh.name = mesh_name
+    return before, count_triangles(objects, weights)
+
+def image_digest(image):
+    """Content hash of an image's packed or on-disk data, None when it has no file data"""
+    digest = hashlib.sha256()
+    if image.packed_file is not None:
+        digest.update(image.packed_file.data)
+    elif image.source == 'FILE' and image.filepath:
+        path = bpy.path.abspath(image.filepath, library=image.library)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        return None
+    # The same file used as color and as non-color data must stay separate
+    digest.update(f"{image.colorspace_settings.name}|{image.alpha_mode}".encode())
+    return digest.hexdigest()
+
+def dedupe_images():
+    """Merge image datablocks with identical content into one, returns the number removed"""
+    keepers = {}
+    removed = 0
+    for image in list(bpy.data.images):
+        if image.library is not None:
+            continue
+        key = image_digest(image)
+        if key is None:
+            continue
+        keeper = keepers.setdefault(key, image)
+        if keeper is not image:
+            image.user_remap(keeper)
+            bpy.data.images.remove(image)
+            removed += 1
+    return removed
+
+def downscale_images(max_size):
+    """Scale images larger than max_size down (keeping the aspect ratio) and pack the result"""
+    scaled = 0
+    for image in bpy.data.images:
+        if image.library is not None or image.source != 'FILE':
+            continue
+        width, height = image.size
+        if max(width, height) <= max_size:
+            continue
+        factor = max_size / max(width, height)
+        image.scale(max(1, round(width * factor)), max(1, round(height * factor)))
+        # Pack the scaled pixels so the saved file does not reference the full-size original
+        image.pack()
+        scaled += 1
+    return scaled
+
+def remap_pointers(struct, copies):
+    """Point every object property of a modifier or constraint at the copy of its target"""
+    for prop in struct.bl_rna.properties:
+        if prop.type != 'POINTER' or prop.is_readonly or prop.fixed_type.identifier != 'Object':
+            continue
+        target = getattr(struct, prop.identifier)
+        if target in copies:
+            setattr(struct, prop.identifier, copies[target])
+
+def remap_object_targets(copy, copies):
+    """Object.copy() keeps armatures, hooks, constraints and drivers pointing at the source objects"""
+    for modifier in copy.modifiers:
+        remap_pointers(modifier, copies)
+    constraints = list(copy.constraints)
+    if copy.pose:
+        constraints.extend(constraint for bone in copy.pose.bones for constraint in bone.constraints)
+    for constraint in constraints:
+        remap_pointers(constraint, copies)
+        # the Armature constraint keeps its bones in a list of targets
+        for target in getattr(constraint, "targets", ()):
+            remap_pointers(target, copies)
+    if copy.animation_data:
+        for fcurve in copy.animation_data.drivers:
+            for variable in fcurve.driver.variables:
+                for target in variable.targets:
+                    if target.id in copies:
+                        target.id = copies[target.id]
+
+def duplicate_model(model_data, source_container):
+    """Place another copy of an already imported model as linked duplicates sharing its data"""
+    name = model_data["name"]
+    print(f"Instancing model: {name} from '{source_container.name}'")
+    target_collection = get_target_collection(model_data.get("collection_name", "3D_Model"))
+    
+    parent_empty = bpy.data.objects.new(f"{name}_container", None)
+    parent_empty.empty_display_type = 'ARROWS'
+    target_collection.objects.link(parent_empty)
+    place(parent_empty, model_data)
+    
+    # children_recursive scans every object in the file, so use the objects recorded at import when known
+    source_objects, roots = container_objects.get(source_container.name, (None, 0))
+    if source_objects is None:
+        source_objects = source_container.children_recursive
+        roots = len(source_container.children)
+    
+    # Object.copy() shares mesh, material and image datablocks with the original
+    copies = {source_container: parent_empty}
+    for obj in source_objects:
+        copies[obj] = obj.copy()
+    for obj, copy in copies.items():
+        if obj is source_container:
+            continue
+        copy.parent = copies[obj.parent]
+        remap_object_targets(copy, copies)
+        target_collection.objects.link(copy)
+    
+    print(f"Created linked duplicate '{parent_empty.name}' with {len(copies) - 1} objects")
+    return parent_empty, target_collection, roots
+
+def scatter_node_group(name, collection):
+    """Geometry nodes that instance a collection on every point, using the rotation and scale attributes"""
+    group = bpy.data.node_groups.new(f"{name}_scatter", 'GeometryNodeTree')
+    group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    nodes, links = group.nodes, group.links
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+    collection_info = nodes.new("GeometryNodeCollectionInfo")
+    collection_info.transform_space = 'ORIGINAL'
+    collection_info.inputs["Collection"].default_value = collection
+    instance = nodes.new("GeometryNodeInstanceOnPoints")
+    links.new(group_input.outputs[0], instance.inputs["Points"])
+    links.new(collection_info.outputs[0], instance.inputs["Instance"])
+    for attribute, socket in (("rotation", "Rotation"), ("scale", "Scale")):
+        named = nodes.new("GeometryNodeInputNamedAttribute")
+        named.data_type = 'FLOAT_VECTOR'
+        named.inputs["Name"].default_value = attribute
+        links.new(named.outputs["Attribute"], instance.inputs[socket])
+    links.new(instance.outputs["Instances"], group_output.inputs[0])
+    return group
+
+def create_scatter(model_data):
+    """Import the model once into a hidden collection and instance it on a point cloud
+
+    The transforms come from an .npz file and are written with foreach_set, so the cost does
+    not grow with Python work per instance.
+    """
+    name = model_data["name"]
+    row = model_data["row"]
+    positions = np.ascontiguousarray(scene_arrays[f"instances_{row}_positions"], dtype=np.float32)
+    rotations = scene_arrays[f"instances_{row}_rotations"]
+    scales = np.ascontiguousarray(scene_arrays[f"instances_{row}_scales"], dtype=np.float32)
+    count = len(positions)
+    
+    # The source model sits at the origin of its own collection, excluded from the view layer
+    source = import_model(dict(model_data, row=None, position=[0.0, 0.0, 0.0], rotation=[0.0, 0.0, 0.0],
+                               scale=[1.0, 1.0, 1.0], collection_name=f"{name}_source",
+                               own_collection=True))
+    if source is None:
+        return None
+    source_container, source_collection, _ = source
+    layer_collection = layer_collection_of(source_collection)
+    if layer_collection is not None:
+        layer_collection.exclude = True
+    
+    mesh = bpy.data.meshes.new(f"{name}_points")
+    mesh.vertices.add(count)
+    mesh.vertices.foreach_set("co", positions.ravel())
+    rotation = mesh.attributes.new("rotation", 'FLOAT_VECTOR', 'POINT')
+    rotation.data.foreach_set("vector", np.radians(rotations).astype(np.float32).ravel())
+    scale = mesh.attributes.new("scale", 'FLOAT_VECTOR', 'POINT')
+    scale.data.foreach_set("vector", scales.ravel())
+    mesh.update()
+    
+    target_collection = get_target_collection(model_data.get("collection_name", "3D_Model"))
+    scatter_obj = bpy.data.objects.new(f"{name}_scatter", mesh)
+    target_collection.objects.link(scatter_obj)
+    place(scatter_obj, model_data)
+    modifier = scatter_obj.modifiers.new("Scatter", 'NODES')
+    modifier.node_group = scatter_node_group(name, source_collection)
+    
+    print(f"Scattered {count} instances of {name} from collection '{source_collection.name}'")
+    return scatter_obj, target_collection, count, source_container, source_collection
+
+def remove_entry(entry):
+    """Delete a previously composed container (or camera) and its collection if it ends up empty"""
+    names = [(entry["object"], entry["collection"])]
+    # Scatters also own the hidden source model and its collection
+    if "source_object" in entry:
+        names.append((entry["source_object"], entry["source_collection"]))
+    for object_name, collection_name in names:
+        obj = bpy.data.objects.get(object_name)
+        if obj is not None:
+            for child in list(obj.children_recursive):
+                bpy.data.objects.remove(child, do_unlink=True)
+            bpy.data.objects.remove(obj, do_unlink=True)
+        collection = bpy.data.collections.get(collection_name)
+        if collection is not None and not collection.all_objects and not collection.children:
+            bpy.data.collections.remove(collection)
+
+def entry_source(model_data):
+    # What must match for an existing container to be reused as is
+    if model_data.get("type") == "camera":
+        return {"type": "camera", "focal_length": model_data["focal_length"],
+                "collection_name": model_data["collection_name"]}
+    source = {"type": "model", "file_digest": model_data.get("file_digest"),
+              "file_format": model_data.get("file_format", ""),
+              "max_triangles": model_data.get("max_triangles", 0),
+              "collection_name": model_data.get("collection_name", "3D_Model")}
+    if model_data.get("type") == "scatter":
+        source.update(type="scatter", instances_digest=model_data["instances_digest"])
+    return source
+
+# Import all 3D models and create cameras, reusing unchanged entries of the previous scene
+total_imported = 0
+stats = {"imported": 0, "instanced": 0, "reused": 0, "moved": 0, "removed": 0}
+new_entries = {}
+seen_keys = {}
+# Containers already in the scene by model source, used to instance repeated files
+placed_sources = {}
+# Objects under containers imported in this run (large-scene mode), by container name
+container_objects = {}
+for row in range(len(scene_names)):
+    model_data = row_data(row)
+    name = model_data["name"]
+    try:
+        object_type = model_data.get("type", "model")
+        # Entries are keyed by type and name; repeated names are numbered in order
+        base_key = f"{object_type}:{name}"
+        seen_keys[base_key] = seen_keys.get(base_key, 0) + 1
+        key = base_key if seen_keys[base_key] == 1 else f"{base_key}#{seen_keys[base_key]}"
+        source = entry_source(model_data)
+        # Placements decimated to different budgets cannot share mesh data
+        source_id = (f"{model_data.get('file_digest')}{model_data.get('file_format', '')}"
+                     f":{model_data.get('max_triangles', 0)}")
+        transform = [model_data["position"], model_data["rotation"], model_data["scale"]]
+
+        previous = manifest_entries.pop(key, None)
+        if previous is not None:
+            obj = bpy.data.objects.get(previous["object"])
+            if obj is not None and previous["source"] == source:
+                if previous["transform"] != transform:
+                    apply_transform(obj, *transform)
+                    stats["moved"] += 1
+                    print(f"Updated transform of '{obj.name}'")
                 else:
-                    print(f"Unsupported file format: {file_format}")
-                    continue
-            except Exception as e:
-                print(f"Error importing {file_format} file {model_file_path}: {e}")
+                    stats["reused"] += 1
+                    print(f"Reused '{obj.name}'")
+                new_entries[key] = dict(previous, transform=transform)
+                total_imported += previous.get("roots", 1)
+                if object_type == "model":
+                    placed_sources.setdefault(source_id, obj.name)
                 continue
-        
-            # Get newly imported objects
-            objects_after = set(bpy.context.scene.objects)
-            new_objects = objects_after - objects_before
-            
-            # Find root objects (objects without parents or with parents not in the new objects)
-            root_objects = []
-            for obj in new_objects:
-                if obj.type in ['MESH', 'EMPTY', 'ARMATURE']:
-                    # Check if this is a root object
-                    is_root = True
-                    if obj.parent is not None:
-                        # If parent is also in new_objects, this is not a root
-                        if obj.parent in new_objects:
-                            is_root = False
-                    
-                    if is_root:
-                        root_objects.append(obj)
-            
-            print(f"Found {len(root_objects)} root objects from {name} (total {len(new_objects)} objects)")
-            
-            # Create a parent Empty object to contain all imported objects as a group
-            parent_empty = bpy.data.objects.new(f"{name}_container", None)
-            parent_empty.empty_display_type = 'ARROWS'
-            target_collection.objects.link(parent_empty)
-
-            # Set parent empty transformations
-            parent_empty.location = position
-            def normalize_rotation(angle_degrees):
-                angle_rad = math.radians(angle_degrees)
-                while angle_rad > math.pi:
-                    angle_rad -= 2 * math.pi
-                while angle_rad < -math.pi:
-                    angle_rad += 2 * math.pi
-                return angle_rad
-            x_rot = normalize_rotation(rotation[0])
-            y_rot = normalize_rotation(rotation[1])
-            z_rot = normalize_rotation(rotation[2])
-            parent_empty.rotation_mode = 'XYZ'
-            parent_empty.rotation_euler = (x_rot, y_rot, z_rot)
-            parent_empty.scale = scale
-
-            print(f"Created parent container '{parent_empty.name}' with transformations: pos{position} rot{rotation} scale{scale}")
-
-            # Parent all new_objects to container, and restore hidden state
-            for obj in new_objects:
-                # Save original hidden state
-                original_hide_viewport = obj.hide_viewport
-                original_hide_render = obj.hide_render
-                original_hide_set = obj.hide_set
-
-                # Move to target collection
-                for collection in obj.users_collection:
-                    collection.objects.unlink(obj)
-                target_collection.objects.link(obj)
-
-                # parent to container
-                obj.parent = parent_empty
-
-                # Restore hidden state
-                obj.hide_viewport = original_hide_viewport
-                obj.hide_render = original_hide_render
-                obj.hide_set = original_hide_set
-
-                print(f"Parented {obj.name} to container '{parent_empty.name}' (hidden: {original_hide_viewport})")
-            
-            total_imported += len(root_objects)
+            remove_entry(previous)
+            stats["removed"] += 1
+
+        source_container = None
+        if object_type == "model" and instance_duplicates:
+            source_container = bpy.data.objects.get(placed_sources.get(source_id, ""))
+        if object_type == "camera":
+            created = create_camera(model_data)
+        elif object_type == "scatter":
+            created = create_scatter(model_data)
+        elif source_container is not None:
+            created = duplicate_model(model_data, source_container)
+        else:
+            created = import_model(model_data)
+        if created is None:
+            continue
+        obj, target_collection, roots = created[:3]
+        if object_type == "model":
+            placed_sources.setdefault(source_id, obj.name)
+        new_entries[key] = {
+            "object": obj.name,
+            "collection": target_collection.name,
+            "source": source,
+            "transform": transform,
+            "roots": roots,
+        }
+        if object_type == "scatter":
+            new_entries[key].update(source_object=created[3].name, source_collection=created[4].name)
+        stats["instanced" if source_container is not None else "imported"] += 1
+        total_imported += roots
         
     except Exception as e:
         print(f"Error processing object {name}: {e}")
 
+apply_pending_transforms()
+remove_staging_collection()
+
+# Entries of the previous scene that are no longer in the models list
+for entry in manifest_entries.values():
+    remove_entry(entry)
+    stats["removed"] += 1
+
+# Textures: merge identical images and cap their resolution before saving
+if dedupe_textures or max_texture_size:
+    merged = dedupe_images() if dedupe_textures else 0
+    scaled = downscale_images(max_texture_size) if max_texture_size else 0
+    print(f"Textures: {len(bpy.data.images)} images, merged {merged} duplicates, downscaled {scaled}")
+
+# Scene triangle budget: decimate every mesh in the scene by the same ratio
+if scene_triangle_budget:
+    # Scatter sources are hidden but drawn once per point, objects outside the view layer not at all
+    drawn = drawn_counts()
+    before, after = decimate_objects(list(drawn), scene_triangle_budget, drawn)
+    print(f"Scene triangles: {before} -> {after} (budget {scene_triangle_budget})")
+
+bpy.context.scene[MANIFEST_KEY] = json.dumps({"source": composition_source, "entries": new_entries})
+print(f"Composition: imported {stats['imported']}, instanced {stats['instanced']}, reused {stats['reused']}, moved {stats['moved']}, removed {stats['removed']}")
+
 # Set render engine and settings
 bpy.context.scene.render.engine = 'CYCLES'  # Use Cycles for better quality
 bpy.context.scene.cycles.samples = 128  # Default samples
@@ -510,15 +1288,22 @@ except Exception as e:
     print(f"Error creating output directory: {e}")
     sys.exit(1)
 
-# Save blend file (direct overwrite)
-try:
-    bpy.ops.wm.save_as_mainfile(filepath=output_blend)
-    print(f"Saved blend file: {output_blend}")
-except Exception as e:
-    print(f"Error saving blend file: {e}")
-    sys.exit(1)
+# Save blend file (direct overwrite); a scene plan may keep the scene in memory only
+if params.get("save_blend", True):
+    try:
+        bpy.ops.wm.save_as_mainfile(filepath=output_blend)
+        print(f"Saved blend file: {output_blend}")
+    except Exception as e:
+        print(f"Error saving blend file: {e}")
+        sys.exit(1)
+
+    # Index the saved scene for camera/object lookups without reloading it
+    try:
+        write_scene_info(os.path.join(output_dir, "scene_info.json"))
+    except Exception as e:
+        print(f"Error writing scene info: {e}")
 
-print(f"Successfully composed scene with {total_imported} objects from {len(models_data)} items")
+print(f"Successfully composed scene with {total_imported} objects from {len(scene_names)} items")
 print(f"Render engine: {bpy.context.scene.render.engine}")
 print(f"Render device: {bpy.context.scene.cycles.device if bpy.context.scene.render.engine == 'CYCLES' else 'CPU'}")
 ''' 
\ No newline at end of file
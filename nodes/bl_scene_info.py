@@ -0,0 +1,56 @@
+import json
+import os
+
+from .disk_cache import file_digest
+from .scene_index import get_scene_info
+
+class BL_Scene_Info:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "blend_file_path": ("STRING", {"default": ""}),
+            },
+            "optional": {
+                "use_worker_pool": ("BOOLEAN", {"default": True}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING",)
+    RETURN_NAMES = ("camera_names", "object_names", "scene_info", "log",)
+    FUNCTION = "read_scene_info"
+    CATEGORY = "Blender"
+    DESCRIPTION = "Read cameras, objects, collections, bounds and triangle counts from a blend file"
+
+    @classmethod
+    def IS_CHANGED(cls, blend_file_path="", **kwargs):
+        try:
+            return file_digest(blend_file_path)
+        except (OSError, TypeError):
+            return ""
+
+    def read_scene_info(self, blend_file_path, use_worker_pool=True):
+        # 初始化日志
+        log_messages = []
+        log_messages.append(f"Blend file: {blend_file_path}")
+
+        if not os.path.exists(blend_file_path):
+            log_messages.append(f"ERROR: Source blend file not found: {blend_file_path}")
+            return ("", "", "{}", "\n".join(log_messages))
+
+        # 已索引的文件直接返回，否则启动一次Blender提取并写入索引
+        info, error = get_scene_info(blend_file_path, use_pool=use_worker_pool)
+        if info is None:
+            log_messages.append(f"ERROR: {error}")
+            return ("", "", "{}", "\n".join(log_messages))
+
+        camera_names = [camera["name"] for camera in info["cameras"]]
+        object_names = [obj["name"] for obj in info["objects"]]
+        log_messages.append(f"Cameras: {', '.join(camera_names) if camera_names else '(none)'}")
+        log_messages.append(f"Objects: {len(object_names)}, collections: {len(info['collections'])}")
+        log_messages.append(f"Triangles: {info['triangles']}")
+        if info.get("bounds"):
+            log_messages.append(f"Bounds: {info['bounds']['min']} - {info['bounds']['max']}")
+
+        return ("\n".join(camera_names), "\n".join(object_names), json.dumps(info, ensure_ascii=False, indent=2),
+                "\n".join(log_messages))
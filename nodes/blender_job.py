@@ -0,0 +1,28 @@
+import contextlib
+import os
+import shutil
+import tempfile
+
+JOBS_DIRNAME = ".bl_jobs"
+
+
+@contextlib.contextmanager
+def blender_job_dir(output_dir, prefix):
+    """为一次Blender作业创建独占的临时目录，结束后删除
+
+    目录位于输出目录下，与最终产物在同一文件系统上，保证 publish_file 的重命名是原子的。
+    """
+    jobs_root = os.path.join(output_dir, JOBS_DIRNAME)
+    os.makedirs(jobs_root, exist_ok=True)
+    job_dir = tempfile.mkdtemp(prefix=f"{prefix}_", dir=jobs_root)
+    try:
+        yield job_dir
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def publish_file(src, dst):
+    """把作业产物原子地移动到最终位置，覆盖同名旧文件"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+    return dst
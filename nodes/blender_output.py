@@ -0,0 +1,203 @@
+import collections
+import re
+import time
+
+# ComfyUI 的进度条仅在 ComfyUI 环境中可用
+try:
+    import comfy.utils
+    PROGRESS_BAR_AVAILABLE = True
+except ImportError:
+    PROGRESS_BAR_AVAILABLE = False
+
+# 脚本打印的阶段标记，例如 "BL_PHASE load_start"
+PHASE_PREFIX = "BL_PHASE "
+
+# Cycles: "Fra:1 Mem:153.22M (Peak 154.96M) | Time:00:01.23 | ... | Sample 12/128"
+# Eevee:  "Fra:1 Mem:... | Time:00:00.51 | Rendering 12 / 64 samples"
+_SAMPLE_RE = re.compile(r"(?:Sample|Rendering) (\d+) ?/ ?(\d+)")
+_PEAK_RE = re.compile(r"Peak:? ?([\d.]+)([KMG])")
+_UNIT_MB = {"K": 1 / 1024, "M": 1.0, "G": 1024.0}
+
+
+class BlenderProgress:
+    """解析渲染脚本的输出，驱动ComfyUI进度条并统计各阶段耗时
+
+    阶段：进程启动（到脚本开始执行）、blend加载、场景同步（到第一个采样）、采样、写出。
+    """
+
+    PHASES = ("process start", "blend load", "scene sync", "sampling", "write")
+
+    def __init__(self, show_progress=True):
+        self.started = time.perf_counter()
+        self.timings = {phase: 0.0 for phase in self.PHASES}
+        self.total = 1
+        self.completed = 0
+        self.samples = None
+        self.samples_reached = []
+        self.peak_memory_mb = 0.0
+        self._load_start = None
+        self._render_start = None
+        self._first_sample = None
+        self._last_sample = None
+        self._bar = None
+        if show_progress and PROGRESS_BAR_AVAILABLE:
+            self._bar = comfy.utils.ProgressBar(100)
+
+    def feed(self, line):
+        now = time.perf_counter()
+        if line.startswith(PHASE_PREFIX):
+            self._phase(line[len(PHASE_PREFIX):].strip(), now)
+            return
+
+        match = _SAMPLE_RE.search(line)
+        if match:
+            current, total = int(match.group(1)), int(match.group(2))
+            if self._first_sample is None and self._render_start is not None:
+                self._first_sample = now
+                self.timings["scene sync"] += now - self._render_start
+            self._last_sample = now
+            self.samples = (current, total)
+            self._update_bar(current / total if total else 0.0)
+
+        match = _PEAK_RE.search(line)
+        if match:
+            self.peak_memory_mb = max(self.peak_memory_mb, float(match.group(1)) * _UNIT_MB[match.group(2)])
+
+    def _phase(self, name, now):
+        if name == "script_start":
+            self.timings["process start"] += now - self.started
+        elif name == "load_start":
+            self._load_start = now
+        elif name == "load_done" and self._load_start is not None:
+            self.timings["blend load"] += now - self._load_start
+        elif name == "render_start":
+            self._render_start = now
+            self._first_sample = self._last_sample = None
+        elif name == "render_done" and self._render_start is not None:
+            if self._first_sample is None:
+                self.timings["scene sync"] += now - self._render_start
+            else:
+                self.timings["sampling"] += self._last_sample - self._first_sample
+                self.timings["write"] += now - self._last_sample
+                self.samples_reached.append(self.samples[0])
+            self.completed += 1
+            self._render_start = None
+            self._update_bar(0.0)
+
+    def _update_bar(self, fraction):
+        if self._bar is None:
+            return
+        total = max(self.total, self.completed + 1)
+        self._bar.update_absolute(int(100 * min(1.0, (self.completed + fraction) / total)), 100)
+
+    def summary(self):
+        parts = [f"{phase} {self.timings[phase]:.2f} s" for phase in self.PHASES]
+        parts.append(f"total {time.perf_counter() - self.started:.2f} s")
+        lines = [f"Timing: {', '.join(parts)}"]
+        if len(self.samples_reached) > 1:
+            reached = self.samples_reached
+            lines.append(f"Samples reached: min {min(reached)}, mean {sum(reached) / len(reached):.0f}, "
+                         f"max {max(reached)} of {self.samples[1]}")
+        elif self.samples is not None:
+            lines.append(f"Samples: {self.samples[0]}/{self.samples[1]}")
+        if self.peak_memory_mb:
+            lines.append(f"Peak memory: {self.peak_memory_mb:.1f} MB")
+        return "\n".join(lines)
+
+
+# 输出详细程度：quiet只打印错误，summary把逐对象的输出汇总为计数，verbose打印全部
+LOG_LEVELS = ("quiet", "summary", "verbose")
+
+# 逐对象、逐集合的输出按类别计数，不逐行保留
+_CHATTER_PATTERNS = (
+    ("objects parented", re.compile(r"^Parented ")),
+    ("collections", re.compile(r"^(Created new|Using existing) collection")),
+    ("containers", re.compile(r"^Created parent container")),
+    ("imports", re.compile(r"^(Importing |Found \d+ root objects|Loaded \d+ objects from asset cache)")),
+    ("instances", re.compile(r"^(Instancing model|Created linked duplicate)")),
+    ("reused", re.compile(r"^(Reused |Updated transform)")),
+    ("cameras", re.compile(r"^Creat(ing|ed) camera")),
+    # 渲染器每个采样的状态行，例如 "Fra:1 Mem:153.22M ... | Sample 12/128"
+    ("render status", re.compile(r"^Fra:\d+ ")),
+)
+# 脚本之间传递信息的标记行（BL_PHASE、BL_RENDER_IMAGE等），只在verbose时打印，不占用末尾窗口
+_MARKER_RE = re.compile(r"^BL_[A-Z_]+ ")
+# 错误行：以错误关键字开头、Python异常（"KeyError: ..."）或独立的单词，
+# 不匹配标识符和文件名中的片段（error_props、failed_model.glb）
+_ERROR_RE = re.compile(r"^\s*(?:error|warning|traceback|exception)\b"
+                       r"|\w*(?:error|exception):"
+                       r"|(?<![/\\.\-])\b(?:error|failed|warning)\b(?![/\\.\-])", re.IGNORECASE)
+
+
+class BlenderLogCapture:
+    """有界地收集Blender输出：只保留末尾若干行和错误行，逐对象的输出只计数
+
+    以 result_prefixes 中任一前缀开头的结果行在读入时另行保存（最多 max_results 行），
+    不会被后续输出挤出末尾窗口。内存占用与输出行数无关；echo 为 True 时按详细程度打印到控制台。
+    """
+
+    def __init__(self, log_level="summary", tail_lines=200, max_errors=50, echo=True, result_prefixes=(),
+                 max_results=500):
+        self.log_level = log_level
+        self.echo = echo
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.errors = collections.deque(maxlen=max_errors)
+        self.counts = collections.Counter()
+        self.total = 0
+        self.result_prefixes = tuple(result_prefixes)
+        self.max_results = max_results
+        self.results = []
+        self.dropped_results = collections.Counter()
+
+    def feed(self, line):
+        self.total += 1
+        if self.result_prefixes and line.startswith(self.result_prefixes):
+            if len(self.results) < self.max_results:
+                self.results.append(line)
+            else:
+                prefix = next(prefix for prefix in self.result_prefixes if line.startswith(prefix))
+                self.dropped_results[prefix] += 1
+        if _MARKER_RE.match(line):
+            if self.log_level == "verbose":
+                self._print(line)
+            return
+        if _ERROR_RE.search(line):
+            self.errors.append(line)
+            self.tail.append(line)
+            self._print(line)
+            return
+        for category, pattern in _CHATTER_PATTERNS:
+            if pattern.search(line):
+                self.counts[category] += 1
+                if self.log_level == "verbose":
+                    self.tail.append(line)
+                    self._print(line)
+                return
+        self.tail.append(line)
+        if self.log_level != "quiet":
+            self._print(line)
+
+    def _print(self, line):
+        if self.echo:
+            print(line)
+
+    def find(self, prefix):
+        """返回以 prefix 开头的行：结果前缀从读入时保存的结果行中查找，其他前缀只查找末尾窗口"""
+        if prefix not in self.result_prefixes:
+            return [line for line in self.tail if line.startswith(prefix)]
+        lines = [line for line in self.results if line.startswith(prefix)]
+        if self.dropped_results[prefix]:
+            lines.append(f"... and {self.dropped_results[prefix]} more '{prefix.strip()}' lines")
+        return lines
+
+    def summary(self, tail=20):
+        """日志用的摘要：行数和各类计数、错误行、最后 tail 行"""
+        counts = ", ".join(f"{category} {count}" for category, count in self.counts.items())
+        lines = [f"Blender output: {self.total} lines" + (f" ({counts})" if counts else "")]
+        if self.errors:
+            lines.append(f"Errors and warnings ({len(self.errors)}):")
+            lines.extend(f"  {line}" for line in self.errors)
+        if tail and self.tail:
+            lines.append(f"Last {min(tail, len(self.tail))} lines:")
+            lines.extend(f"  {line}" for line in list(self.tail)[-tail:])
+        return lines
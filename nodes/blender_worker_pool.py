@@ -0,0 +1,460 @@
+import atexit
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from .blender_manager import BlenderManager
+
+# 进程池配置，可通过环境变量覆盖
+WORKER_POOL_SIZE = int(os.environ.get("BLENDER_WORKER_POOL_SIZE", "2"))
+WORKER_MAX_JOBS = int(os.environ.get("BLENDER_WORKER_MAX_JOBS", "25"))
+WORKER_START_TIMEOUT = float(os.environ.get("BLENDER_WORKER_START_TIMEOUT", "180"))
+# 单个作业的默认超时（秒），调用方未指定时使用，0表示不限制
+JOB_TIMEOUT = float(os.environ.get("BLENDER_JOB_TIMEOUT", "3600"))
+
+_WORKER_MARKER = "@@BL_WORKER@@"
+
+
+class BlenderWorkerError(RuntimeError):
+    """Blender worker 启动失败或作业超时"""
+
+
+class BlenderWorker:
+    """常驻的后台Blender进程，通过stdin逐行接收作业，通过stdout回传输出"""
+
+    def __init__(self, blender_bin, worker_script, max_jobs=WORKER_MAX_JOBS):
+        self.blender_bin = blender_bin
+        self.worker_script = worker_script
+        self.max_jobs = max_jobs
+        self.jobs_done = 0
+        self.process = None
+        self._lines = queue.Queue()
+        # worker在回报作业完成后会立即重置场景，重置结束前的输出需要跳过
+        self._resetting = False
+
+    def start(self):
+        cmd = [self.blender_bin, "--background", "--factory-startup", "--python", self.worker_script]
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        reader = threading.Thread(target=self._read_output, daemon=True)
+        reader.start()
+
+        # 等待worker完成启动
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        while True:
+            line = self._next_line(deadline)
+            if line is None:
+                raise BlenderWorkerError(f"Blender worker exited during startup (return code: {self.process.wait()})")
+            if line.startswith(f"{_WORKER_MARKER} READY"):
+                return
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            self._lines.put(line.rstrip("\r\n"))
+        self._lines.put(None)
+
+    def _next_line(self, deadline):
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return self._lines.get(timeout=timeout)
+        except queue.Empty:
+            # 卡住的worker不会响应关闭请求，直接结束进程
+            self.process.kill()
+            self.process.wait()
+            raise BlenderWorkerError("Blender worker timed out")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def exhausted(self):
+        return self.jobs_done >= self.max_jobs
+
+    def run_job(self, steps, cwd=None, on_line=None, timeout=None):
+        """执行一个作业，steps 为 [(脚本路径, 参数列表), ...]，在同一场景会话中依次运行
+
+        返回第一个失败脚本的返回码（全部成功时为0，worker崩溃时返回进程返回码）。
+        """
+        job = {"steps": [{"script_path": path, "args": list(args)} for path, args in steps], "cwd": cwd}
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            return self.process.wait() or 1
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            line = self._next_line(deadline)
+            if line is None:
+                # worker在作业中崩溃
+                return self.process.wait() or 1
+            if self._resetting:
+                # 上一个作业结束后的场景重置输出不属于本作业
+                if line.startswith(f"{_WORKER_MARKER} RESET"):
+                    self._resetting = False
+                continue
+            if line.startswith(f"{_WORKER_MARKER} DONE"):
+                self.jobs_done += 1
+                self._resetting = True
+                status = json.loads(line[len(_WORKER_MARKER) + len(" DONE"):])
+                return status.get("returncode", 1)
+            if on_line is not None:
+                on_line(line)
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            self.process.stdin.write(json.dumps({"op": "shutdown"}) + "\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class BlenderWorkerPool:
+    """管理一组常驻Blender worker，作业之间重置场景，崩溃或达到作业上限后自动重启"""
+
+    def __init__(self, blender_bin, size=WORKER_POOL_SIZE, max_jobs=WORKER_MAX_JOBS):
+        self.blender_bin = blender_bin
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self._idle = []
+        self._busy = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker_script = _write_worker_script()
+
+    def _acquire(self):
+        with self._cond:
+            while not self._idle and self._busy >= self.size:
+                self._cond.wait()
+            worker = self._idle.pop() if self._idle else None
+            self._busy += 1
+
+        if worker is not None and worker.is_alive():
+            return worker
+        try:
+            worker = BlenderWorker(self.blender_bin, self._worker_script, self.max_jobs)
+            print(f"Starting Blender worker ({self._busy}/{self.size} busy)")
+            worker.start()
+            return worker
+        except Exception:
+            if worker is not None:
+                worker.stop()
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker):
+        keep = worker.is_alive() and not worker.exhausted
+        with self._cond:
+            self._busy -= 1
+            if keep and not self._closed:
+                self._idle.append(worker)
+                worker = None
+            self._cond.notify()
+        if worker is not None:
+            worker.stop()
+
+    def run(self, steps, cwd=None, on_line=None, timeout=None):
+        worker = self._acquire()
+        try:
+            return worker.run_job(steps, cwd=cwd, on_line=on_line, timeout=timeout)
+        finally:
+            self._release(worker)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+        try:
+            os.remove(self._worker_script)
+        except OSError:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(blender_bin=None):
+    """返回指定Blender可执行文件对应的进程池（按需创建）"""
+    if blender_bin is None:
+        blender_bin = BlenderManager().get_blender_path()
+    with _pools_lock:
+        pool = _pools.get(blender_bin)
+        if pool is None:
+            pool = BlenderWorkerPool(blender_bin)
+            _pools[blender_bin] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_worker_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def _job_timeout(timeout):
+    """调用方未指定超时时使用 BLENDER_JOB_TIMEOUT"""
+    if timeout is None and JOB_TIMEOUT > 0:
+        return JOB_TIMEOUT
+    return timeout
+
+
+def run_blender_script(script_path, script_args=(), cwd=None, on_line=None, use_pool=True, timeout=None,
+                       cpus=None):
+    """在Blender中运行脚本，逐行回调输出，返回返回码
+
+    use_pool 为 True 时使用常驻worker，否则为本次调用单独启动一个Blender进程。
+    cpus 指定独立进程绑定的CPU集合（仅Linux有效，常驻worker忽略该参数）。
+    timeout 为空时使用 BLENDER_JOB_TIMEOUT，超时抛出 BlenderWorkerError。
+    """
+    timeout = _job_timeout(timeout)
+    if on_line is None:
+        on_line = print
+    blender_bin = BlenderManager().get_blender_path()
+
+    if use_pool and WORKER_POOL_SIZE > 0:
+        return get_worker_pool(blender_bin).run([(script_path, script_args)], cwd=cwd, on_line=on_line,
+                                                timeout=timeout)
+
+    cmd = [blender_bin, "--background", "--factory-startup", "--python", script_path]
+    if script_args:
+        cmd += ["--"] + list(script_args)
+    # 不使用preexec_fn：它在多线程进程（分块渲染的线程池）中可能使子进程死锁。
+    # 优先用taskset在exec前绑定；没有taskset时在启动后立即设置，Blender的线程随后继承
+    set_affinity = False
+    if cpus and hasattr(os, "sched_setaffinity"):
+        taskset = shutil.which("taskset")
+        if taskset:
+            cmd = [taskset, "-c", ",".join(str(cpu) for cpu in sorted(cpus))] + cmd
+        else:
+            set_affinity = True
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        cwd=cwd,
+    )
+    if set_affinity:
+        try:
+            os.sched_setaffinity(process.pid, cpus)
+        except OSError:
+            pass
+    # 超时由看门狗计时器强制结束进程，避免stdout一直不结束时 wait 永远不被调用
+    timed_out = threading.Event()
+    watchdog = None
+    if timeout is not None:
+        def kill():
+            timed_out.set()
+            process.kill()
+        watchdog = threading.Timer(timeout, kill)
+        watchdog.daemon = True
+        watchdog.start()
+    try:
+        for line in process.stdout:
+            on_line(line.rstrip("\r\n"))
+        returncode = process.wait()
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+    if timed_out.is_set():
+        raise BlenderWorkerError(f"Blender timed out after {timeout} seconds")
+    return returncode
+
+
+def run_blender_steps(steps, cwd=None, on_line=None, use_pool=True, timeout=None):
+    """在同一个Blender会话中依次运行多个脚本，steps 为 [(脚本路径, 参数列表), ...]
+
+    后面的脚本直接使用前面脚本留下的场景，遇到第一个失败的脚本即停止并返回其返回码。
+    """
+    steps = [(path, list(args)) for path, args in steps]
+    timeout = _job_timeout(timeout)
+    if len(steps) == 1:
+        return run_blender_script(steps[0][0], steps[0][1], cwd=cwd, on_line=on_line, use_pool=use_pool,
+                                  timeout=timeout)
+    if on_line is None:
+        on_line = print
+    blender_bin = BlenderManager().get_blender_path()
+
+    if use_pool and WORKER_POOL_SIZE > 0:
+        return get_worker_pool(blender_bin).run(steps, cwd=cwd, on_line=on_line, timeout=timeout)
+
+    # 独立进程：由链式脚本在一个进程中依次执行各步骤
+    fd, steps_path = tempfile.mkstemp(prefix="blender_steps_", suffix=".json", dir=cwd)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump([{"script_path": path, "args": args} for path, args in steps], f)
+    fd, chain_script = tempfile.mkstemp(prefix="blender_chain_", suffix=".py", dir=cwd)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(_BLENDER_CHAIN_SCRIPT)
+    try:
+        return run_blender_script(chain_script, [steps_path], cwd=cwd, on_line=on_line, use_pool=False,
+                                  timeout=timeout)
+    finally:
+        for path in (steps_path, chain_script):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _write_worker_script():
+    fd, path = tempfile.mkstemp(prefix="blender_worker_", suffix=".py")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(_BLENDER_WORKER_SCRIPT.replace("@@MARKER@@", _WORKER_MARKER))
+    return path
+
+
+# Blender worker script: runs jobs read from stdin until shutdown
+_BLENDER_WORKER_SCRIPT = r'''
+import bpy
+import sys
+import os
+import gc
+import json
+import runpy
+import traceback
+
+MARKER = "@@MARKER@@"
+base_argv = list(sys.argv)
+
+
+def flush_output():
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Blender's own C-level messages are buffered separately from Python's
+    try:
+        import ctypes
+        if os.name == "nt":
+            ctypes.cdll.ucrtbase.fflush(None)
+        else:
+            ctypes.CDLL(None).fflush(None)
+    except Exception:
+        pass
+
+
+def reset_state():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    gc.collect()
+
+
+def run_script(script_path, args):
+    sys.argv = [base_argv[0], "--background", "--python", script_path, "--"] + args
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            return e.code
+        elif e.code is not None:
+            print(e.code)
+            return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def run_job(job):
+    # Steps share one scene: later scripts continue from what earlier ones left
+    steps = job.get("steps") or [{"script_path": job["script_path"], "args": job.get("args", [])}]
+    cwd = os.getcwd()
+    returncode = 0
+    try:
+        if needs_reset:
+            reset_state()
+        if job.get("cwd"):
+            os.chdir(job["cwd"])
+        for step in steps:
+            returncode = run_script(step["script_path"], step.get("args", []))
+            if returncode != 0:
+                break
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.argv = base_argv
+        os.chdir(cwd)
+    return returncode
+
+
+needs_reset = False
+print(f"{MARKER} READY", flush=True)
+for line in sys.stdin:
+    line = line.strip()
+    if not line:
+        continue
+    job = json.loads(line)
+    if job.get("op") == "shutdown":
+        break
+    returncode = run_job(job)
+    flush_output()
+    print(f"{MARKER} DONE " + json.dumps({"returncode": returncode}), flush=True)
+    # Free the finished job's scene right away instead of keeping it while idle
+    try:
+        reset_state()
+        needs_reset = False
+    except BaseException:
+        traceback.print_exc()
+        needs_reset = True
+    flush_output()
+    print(f"{MARKER} RESET", flush=True)
+'''
+
+
+# One-shot chain script: runs several job scripts in this Blender session
+_BLENDER_CHAIN_SCRIPT = r'''
+import sys
+import json
+import runpy
+import traceback
+
+base_argv = list(sys.argv)
+with open(sys.argv[sys.argv.index("--") + 1], "r", encoding="utf-8") as f:
+    steps = json.load(f)
+
+returncode = 0
+for step in steps:
+    sys.argv = [base_argv[0], "--background", "--python", step["script_path"], "--"] + step.get("args", [])
+    try:
+        runpy.run_path(step["script_path"], run_name="__main__")
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            returncode = e.code
+        elif e.code is not None:
+            print(e.code)
+            returncode = 1
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+    if returncode != 0:
+        break
+
+sys.argv = base_argv
+sys.stdout.flush()
+sys.exit(returncode)
+'''
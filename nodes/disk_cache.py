@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# 缓存根目录，可通过环境变量覆盖
+CACHE_DIR = os.environ.get("BLENDER_IN_COMFYUI_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../cache'))
+
+# 超过该时长（秒）的预留临时文件视为中断的写入遗留，扫描时删除
+_TMP_GRACE_SECONDS = 24 * 3600
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path):
+    """返回文件内容的sha256，按(路径, 大小, 修改时间)记忆，避免重复读取大文件"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def params_digest(*parts):
+    """返回任意可JSON序列化参数的sha256"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskLRUCache:
+    """以内容哈希为键的磁盘缓存，总大小超过上限时淘汰最久未使用的条目"""
+
+    def __init__(self, name, max_bytes):
+        self.directory = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 缓存目录总大小的估计值，首次发布时扫描得到，之后随发布累加
+        self._total = None
+
+    def path_for(self, key, suffix):
+        return os.path.join(self.directory, key[:2], f"{key}{suffix}")
+
+    def get(self, key, suffix):
+        """命中时返回条目路径并刷新其使用时间，否则返回None"""
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def reserve(self, key, suffix):
+        """返回与条目同目录的临时文件路径，写完后调用commit发布"""
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=suffix, dir=os.path.dirname(path))
+        os.close(fd)
+        return tmp_path
+
+    def discard(self, tmp_path):
+        """删除写入失败的预留临时文件"""
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def commit(self, key, suffix, tmp_path):
+        """原子地发布条目；总大小超过上限时才扫描目录淘汰旧条目"""
+        path = self.path_for(key, suffix)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._total is not None:
+                self._total += size - replaced
+            over_limit = self._total is None or self._total > self.max_bytes
+        if over_limit:
+            self.evict()
+        return path
+
+    def evict(self):
+        """扫描缓存目录，超过上限时按最久未使用淘汰条目，并删除中断的写入遗留的临时文件"""
+        with self._lock:
+            entries = []
+            total = 0
+            stale = time.time() - _TMP_GRACE_SECONDS
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if name.startswith(".tmp_"):
+                        # 仍在写入的预留不计入大小；进程崩溃等遗留的旧预留直接删除
+                        if stat.st_mtime < stale:
+                            self.discard(path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            # 淘汰到上限的90%，缓存已满时不必每次发布都重新扫描目录
+            target = self.max_bytes * 0.9 if total > self.max_bytes else self.max_bytes
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total = total
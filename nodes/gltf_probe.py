@@ -0,0 +1,287 @@
+import base64
+import json
+import mmap
+import os
+import struct
+from urllib.parse import unquote
+
+# 只读取头部和JSON，不解码几何数据：GLB通过mmap访问，贴图尺寸只读文件头
+
+_GLB_MAGIC = b"glTF"
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+
+# accessor.componentType -> 字节数
+_COMPONENT_SIZES = {5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4}
+# accessor.type -> 分量个数
+_TYPE_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+# 读取贴图尺寸时最多解码的data URI前缀（JPEG的SOF段通常在前几十KB内）
+_DATA_URI_PREFIX = 256 * 1024
+
+
+class GltfProbeError(ValueError):
+    """文件不是有效的glTF/GLB，或者结构自相矛盾（截断、越界等）"""
+
+
+def probe_gltf(path):
+    """读取glTF/GLB的统计信息，返回字典
+
+    包含文件和缓冲区大小、网格/图元/访问器数量、顶点数和三角面数（按唯一网格计，不含节点实例化）、
+    POSITION访问器给出的网格局部包围盒，以及每张贴图的尺寸。文件损坏时抛出 GltfProbeError。
+    """
+    try:
+        return _probe(path)
+    except GltfProbeError:
+        raise
+    except (TypeError, AttributeError, KeyError, IndexError, ValueError, struct.error) as e:
+        # 字段类型错误等结构问题（例如字符串形式的访问器序号）同样视为文件无效
+        raise GltfProbeError(f"Malformed glTF structure: {type(e).__name__}: {e}")
+
+
+def _probe(path):
+    file_size = os.path.getsize(path)
+    if path.lower().endswith(".glb"):
+        with open(path, "rb") as f:
+            if file_size < 20:
+                raise GltfProbeError(f"File too small for GLB: {file_size} bytes")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                document, bin_offset, bin_size = _read_glb_header(mm, file_size)
+
+                def read_view(view, offset, size):
+                    start = bin_offset + view.get("byteOffset", 0) + offset
+                    return mm[start:start + size]
+
+                stats = _collect_stats(document, path, bin_size, read_view)
+    else:
+        with open(path, "rb") as f:
+            try:
+                document = json.loads(f.read())
+            except ValueError as e:
+                raise GltfProbeError(f"Invalid glTF JSON: {e}")
+        bin_size = None
+        stats = _collect_stats(document, path, bin_size, None)
+
+    stats["format"] = "glb" if path.lower().endswith(".glb") else "gltf"
+    stats["file_size"] = file_size
+    return stats
+
+
+def _read_glb_header(mm, file_size):
+    magic, version, length = struct.unpack_from("<4sII", mm, 0)
+    if magic != _GLB_MAGIC:
+        raise GltfProbeError("Not a GLB file (bad magic)")
+    if version != 2:
+        raise GltfProbeError(f"Unsupported GLB version: {version}")
+    if length > file_size:
+        raise GltfProbeError(f"GLB truncated: header says {length} bytes, file has {file_size}")
+
+    json_length, json_type = struct.unpack_from("<II", mm, 12)
+    if json_type != _CHUNK_JSON or 20 + json_length > length:
+        raise GltfProbeError("GLB JSON chunk missing or out of bounds")
+    try:
+        document = json.loads(mm[20:20 + json_length])
+    except ValueError as e:
+        raise GltfProbeError(f"Invalid GLB JSON chunk: {e}")
+
+    bin_offset, bin_size = 0, None
+    offset = 20 + json_length
+    if offset + 8 <= length:
+        chunk_length, chunk_type = struct.unpack_from("<II", mm, offset)
+        if chunk_type == _CHUNK_BIN:
+            if offset + 8 + chunk_length > length:
+                raise GltfProbeError("GLB BIN chunk out of bounds")
+            bin_offset, bin_size = offset + 8, chunk_length
+    return document, bin_offset, bin_size
+
+
+def _collect_stats(document, path, bin_size, read_view):
+    if not isinstance(document, dict) or "asset" not in document:
+        raise GltfProbeError("glTF JSON has no asset description")
+    base_dir = os.path.dirname(path)
+    buffers = document.get("buffers", [])
+    views = document.get("bufferViews", [])
+    accessors = document.get("accessors", [])
+
+    # 缓冲区：GLB的第一个无uri缓冲区即BIN块，其余为外部文件或data URI
+    buffer_sizes = []
+    missing_files = []
+    for index, buffer in enumerate(buffers):
+        declared = buffer.get("byteLength", 0)
+        uri = buffer.get("uri")
+        if uri is None:
+            if bin_size is None or declared > bin_size:
+                raise GltfProbeError(f"Buffer {index} exceeds the GLB BIN chunk")
+        elif not uri.startswith("data:"):
+            buffer_path = _local_path(base_dir, uri)
+            if not os.path.exists(buffer_path):
+                missing_files.append(uri)
+            elif os.path.getsize(buffer_path) < declared:
+                raise GltfProbeError(f"Buffer file truncated: {uri}")
+        buffer_sizes.append(declared)
+
+    for index, view in enumerate(views):
+        buffer = view.get("buffer", -1)
+        if not 0 <= buffer < len(buffers):
+            raise GltfProbeError(f"bufferView {index} references missing buffer {buffer}")
+        if view.get("byteOffset", 0) + view.get("byteLength", 0) > buffer_sizes[buffer]:
+            raise GltfProbeError(f"bufferView {index} out of buffer bounds")
+
+    for index, accessor in enumerate(accessors):
+        if "bufferView" not in accessor or accessor.get("count", 0) == 0:
+            continue
+        view_index = accessor["bufferView"]
+        if not 0 <= view_index < len(views):
+            raise GltfProbeError(f"Accessor {index} references missing bufferView {view_index}")
+        view = views[view_index]
+        element = (_COMPONENT_SIZES.get(accessor.get("componentType"), 0)
+                   * _TYPE_COMPONENTS.get(accessor.get("type"), 0))
+        stride = view.get("byteStride", element)
+        end = accessor.get("byteOffset", 0) + stride * (accessor["count"] - 1) + element
+        if end > view.get("byteLength", 0):
+            raise GltfProbeError(f"Accessor {index} out of bufferView bounds")
+
+    # 网格：顶点数取POSITION的count，三角面数按图元模式由索引数（或顶点数）推算
+    primitives = 0
+    vertices = 0
+    triangles = 0
+    bounds_min = None
+    bounds_max = None
+    for mesh in document.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            primitives += 1
+            position = _accessor(accessors, primitive.get("attributes", {}).get("POSITION"))
+            count = position.get("count", 0)
+            vertices += count
+            indices = _accessor(accessors, primitive.get("indices"))
+            element_count = indices.get("count", count) if indices else count
+            mode = primitive.get("mode", 4)
+            if mode == 4:
+                triangles += element_count // 3
+            elif mode in (5, 6):
+                triangles += max(0, element_count - 2)
+            if "min" in position and "max" in position:
+                if bounds_min is None:
+                    bounds_min, bounds_max = list(position["min"]), list(position["max"])
+                else:
+                    bounds_min = [min(a, b) for a, b in zip(bounds_min, position["min"])]
+                    bounds_max = [max(a, b) for a, b in zip(bounds_max, position["max"])]
+
+    images = []
+    for index, image in enumerate(document.get("images", [])):
+        uri = image.get("uri")
+        if isinstance(uri, str) and uri.startswith("data:"):
+            # 内嵌的data URI可能有数MB，不作为名称保存
+            uri = f"<embedded {index}>"
+        info = {"name": image.get("name") or uri or f"image_{index}",
+                "mime_type": image.get("mimeType"), "width": None, "height": None, "size": None}
+        try:
+            read = _image_reader(image, buffers, views, base_dir, read_view, info, missing_files)
+            if read is not None:
+                info["width"], info["height"] = _image_dimensions(read) or (None, None)
+        except (OSError, ValueError, IndexError, KeyError, TypeError, struct.error):
+            pass
+        images.append(info)
+
+    sizes = [max(image["width"], image["height"]) for image in images if image["width"]]
+    return {
+        "version": document["asset"].get("version"),
+        "generator": document["asset"].get("generator"),
+        "buffers_size": sum(buffer_sizes),
+        "meshes": len(document.get("meshes", [])),
+        "primitives": primitives,
+        "accessors": len(accessors),
+        "vertices": vertices,
+        "triangles": triangles,
+        "nodes": len(document.get("nodes", [])),
+        "materials": len(document.get("materials", [])),
+        "bounds": {"min": bounds_min, "max": bounds_max} if bounds_min is not None else None,
+        "images": images,
+        "max_texture_size": max(sizes) if sizes else 0,
+        "missing_files": missing_files,
+    }
+
+
+def _accessor(accessors, index):
+    if index is None:
+        return {}
+    if not 0 <= index < len(accessors):
+        raise GltfProbeError(f"Primitive references missing accessor {index}")
+    return accessors[index]
+
+
+def _local_path(base_dir, uri):
+    """外部文件的URI是相对路径引用，需要先解码百分号转义（例如 my%20tex.png）"""
+    return os.path.join(base_dir, unquote(uri))
+
+
+def _image_reader(image, buffers, views, base_dir, read_view, info, missing_files):
+    """返回按 (offset, size) 读取图像字节的函数，读不到时返回None"""
+    if "bufferView" in image:
+        view = views[image["bufferView"]]
+        info["size"] = view.get("byteLength", 0)
+        # 只读取GLB的BIN块中的图像
+        if read_view is None or "uri" in buffers[view["buffer"]]:
+            return None
+        return lambda offset, size: read_view(view, offset, min(size, max(0, info["size"] - offset)))
+
+    uri = image.get("uri", "")
+    if uri.startswith("data:"):
+        payload = uri.split(",", 1)[1]
+        info["size"] = len(payload) * 3 // 4
+        prefix = payload[:_DATA_URI_PREFIX // 3 * 4]
+        data = base64.b64decode(prefix + "=" * (-len(prefix) % 4))
+        return lambda offset, size: data[offset:offset + size]
+
+    image_path = _local_path(base_dir, uri)
+    if not os.path.exists(image_path):
+        missing_files.append(uri)
+        return None
+    info["size"] = os.path.getsize(image_path)
+
+    def read_file(offset, size):
+        with open(image_path, "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+    return read_file
+
+
+def _image_dimensions(read):
+    """从PNG/JPEG文件头读取 (宽, 高)，无法识别时返回None"""
+    header = read(0, 24)
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and len(header) >= 24:
+        return struct.unpack(">II", header[16:24])
+    if header[:2] != b"\xff\xd8":
+        return None
+    # JPEG：逐段跳过，直到帧头(SOF)
+    offset = 2
+    while True:
+        segment = read(offset, 9)
+        if len(segment) < 4 or segment[0] != 0xFF:
+            return None
+        marker = segment[1]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if len(segment) < 9:
+                return None
+            height, width = struct.unpack(">HH", segment[5:9])
+            return width, height
+        offset += 2 + struct.unpack(">H", segment[2:4])[0]
+
+
+def check_limits(stats, max_file_mb=0, max_triangles=0, max_texture_size=0):
+    """返回超出限制的说明列表（限制为0表示不限制）"""
+    problems = []
+    if max_file_mb and stats["file_size"] > max_file_mb * 1024 * 1024:
+        problems.append(f"file size {stats['file_size'] / (1024 * 1024):.1f} MB exceeds {max_file_mb} MB")
+    if max_triangles and stats.get("triangles", 0) > max_triangles:
+        problems.append(f"{stats['triangles']} triangles exceed {max_triangles}")
+    if max_texture_size and stats.get("max_texture_size", 0) > max_texture_size:
+        problems.append(f"texture size {stats['max_texture_size']} px exceeds {max_texture_size} px")
+    return problems
+
+
+def probe_warnings(stats):
+    """返回不属于限制的检查警告（缺少的外部文件），不会导致模型被拒绝"""
+    if stats.get("missing_files"):
+        return [f"missing files: {', '.join(stats['missing_files'])}"]
+    return []
@@ -0,0 +1,104 @@
+import functools
+import os
+
+from .gltf_probe import GltfProbeError, check_limits, probe_gltf, probe_warnings
+
+# 模型参数、模型合并和模型集合节点共用的模型数据处理
+
+SUPPORTED_FORMATS = ['.glb', '.gltf', '.fbx', '.obj']
+
+
+def get_base_dir(folder_type):
+    """根据选择获取对应的目录"""
+    # 在函数内导入，场景描述等模块可以脱离ComfyUI使用（例如基准测试）
+    import folder_paths
+    if folder_type == "input":
+        return folder_paths.get_input_directory()
+    return folder_paths.get_output_directory()
+
+
+@functools.lru_cache(maxsize=4096)
+def _probe_file(path, size, mtime_ns):
+    file_ext = os.path.splitext(path)[1].lower()
+    if file_ext not in ['.glb', '.gltf']:
+        return {"format": file_ext.lstrip("."), "file_size": size}, None
+    try:
+        return probe_gltf(path), None
+    except (GltfProbeError, OSError) as e:
+        return None, str(e)
+
+
+def probe_model(path):
+    """返回 (文件统计, 错误信息)，按路径、大小和修改时间缓存，同一文件只检查一次"""
+    stat = os.stat(path)
+    return _probe_file(path, stat.st_size, stat.st_mtime_ns)
+
+
+def build_model_data(full_model_path, position=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0),
+                     name=None, collection_name="3D_Model", max_triangles=0, limits=(0, 0, 0),
+                     limit_action="warn"):
+    """检查模型文件并创建模型数据字典，返回 (模型数据, 警告列表, 错误信息)
+
+    limits 为 (文件大小MB, 三角面数, 贴图尺寸)，0表示不限制。出错时模型数据为None。
+    """
+    # 检查文件是否存在
+    if not os.path.exists(full_model_path):
+        return None, [], f"Model file not found: {full_model_path}"
+
+    # 检查文件格式
+    file_ext = os.path.splitext(full_model_path)[1].lower()
+    if file_ext not in SUPPORTED_FORMATS:
+        return None, [], f"Unsupported file format: {file_ext} (supported: {', '.join(SUPPORTED_FORMATS)})"
+
+    # 只读文件头检查glTF/GLB（不解码几何数据），损坏的文件在合成前就被拒绝
+    probe, error = probe_model(full_model_path)
+    if probe is None:
+        return None, [], f"Invalid {file_ext} file {full_model_path}: {error}"
+
+    problems = check_limits(probe, *limits)
+    if problems and limit_action == "reject":
+        return None, problems, f"Model rejected: {'; '.join(problems)}"
+    # 缺少的外部文件只作为警告，Blender导入时仍可能找到（或不需要）它们
+    problems = problems + probe_warnings(probe)
+
+    model_data = {
+        "file_path": full_model_path,
+        "position": tuple(position),
+        "rotation": tuple(rotation),
+        "scale": tuple(scale),
+        "name": name or os.path.splitext(os.path.basename(full_model_path))[0],
+        "collection_name": collection_name,
+        "file_format": file_ext,
+        "max_triangles": max_triangles,
+        "probe": probe,
+        "probe_warnings": problems
+    }
+    return model_data, problems, None
+
+
+def normalize_models(models):
+    """标准化输入为列表格式"""
+    if models is None:
+        return []
+    elif isinstance(models, dict):
+        return [models]
+    elif isinstance(models, list):
+        return models
+    else:
+        print(f"WARNING: Unexpected model format: {type(models)}")
+        return []
+
+
+def validate_model(model):
+    """验证模型数据格式"""
+    if not isinstance(model, dict):
+        return False
+
+    # 检查是否是摄像机
+    if model.get("type") == "camera":
+        required_keys = ['type', 'name', 'position', 'rotation', 'scale', 'collection_name', 'focal_length']
+    else:
+        # 检查是否是3D模型
+        required_keys = ['file_path', 'position', 'rotation', 'scale', 'name']
+
+    return all(key in model for key in required_keys)
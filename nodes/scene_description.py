@@ -0,0 +1,248 @@
+import os
+import numpy as np
+
+from .model_utils import validate_model
+
+# 条目类型，数组中按序号保存
+KINDS = ("model", "camera", "scatter")
+
+
+class SceneRecord:
+    """场景描述中一行的只读视图，字段按需从数组中读取"""
+
+    __slots__ = ("scene", "index")
+
+    def __init__(self, scene, index):
+        self.scene = scene
+        self.index = index
+
+    @property
+    def kind(self):
+        return KINDS[self.scene.kinds[self.index]]
+
+    @property
+    def name(self):
+        return self.scene.names[self.index]
+
+    @property
+    def file_path(self):
+        path_index = self.scene.path_index[self.index]
+        return self.scene.paths[path_index] if path_index >= 0 else None
+
+    @property
+    def file_format(self):
+        path_index = self.scene.path_index[self.index]
+        return self.scene.path_formats[path_index] if path_index >= 0 else None
+
+    @property
+    def probe(self):
+        path_index = self.scene.path_index[self.index]
+        return self.scene.path_probes[path_index] if path_index >= 0 else None
+
+    @property
+    def probe_warnings(self):
+        return self.scene.warnings.get(self.index, [])
+
+    @property
+    def collection_name(self):
+        return self.scene.collections[self.scene.collection_index[self.index]]
+
+    @property
+    def position(self):
+        return tuple(self.scene.transforms[self.index, 0:3].tolist())
+
+    @property
+    def rotation(self):
+        return tuple(self.scene.transforms[self.index, 3:6].tolist())
+
+    @property
+    def scale(self):
+        return tuple(self.scene.transforms[self.index, 6:9].tolist())
+
+    def to_dict(self):
+        """转换回节点之间传递的模型数据字典"""
+        data = {"name": self.name, "position": self.position, "rotation": self.rotation, "scale": self.scale,
+                "collection_name": self.collection_name}
+        if self.kind == "camera":
+            data.update(type="camera", focal_length=float(self.scene.focal_lengths[self.index]))
+            return data
+        data.update(file_path=self.file_path, file_format=self.file_format,
+                    max_triangles=int(self.scene.max_triangles[self.index]))
+        if self.probe is not None:
+            data.update(probe=self.probe, probe_warnings=list(self.probe_warnings))
+        if self.kind == "scatter":
+            data.update(type="scatter", instances=self.scene.instances[self.index])
+        return data
+
+
+class SceneDescription:
+    """结构数组形式的模型列表（MODELS 的紧凑表示）
+
+    变换保存在连续的 float32 数组中（每行 位置、旋转角度、缩放 共9个数），文件路径和集合名只保存一次，
+    各行以序号引用；文件检查结果（probe）按文件保存，检查警告只为有警告的行保存。
+    可由模型数据字典（及其列表）构造，save() 写出供Blender脚本读取的 .npz。
+    """
+
+    __slots__ = ("kinds", "names", "path_index", "paths", "path_formats", "path_probes", "collection_index",
+                 "collections", "transforms", "max_triangles", "focal_lengths", "instances", "warnings")
+
+    def __init__(self):
+        self.kinds = np.zeros(0, dtype=np.uint8)
+        self.names = []
+        self.path_index = np.zeros(0, dtype=np.int32)
+        self.paths = []
+        self.path_formats = []
+        self.path_probes = []
+        self.collection_index = np.zeros(0, dtype=np.int32)
+        self.collections = []
+        self.transforms = np.zeros((0, 9), dtype=np.float32)
+        self.max_triangles = np.zeros(0, dtype=np.int64)
+        self.focal_lengths = np.zeros(0, dtype=np.float32)
+        # 散布条目的实例数组：行号 -> {"positions", "rotations", "scales"}
+        self.instances = {}
+        # 有检查警告的行：行号 -> 警告列表
+        self.warnings = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return (SceneRecord(self, index) for index in range(len(self)))
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+    @classmethod
+    def from_models(cls, models):
+        """由模型数据字典、字典列表或场景描述（可嵌套在列表中）构造，无效的字典被跳过并打印警告"""
+        parts = []
+        pending = []
+        for model in _flatten(models):
+            if isinstance(model, SceneDescription):
+                if pending:
+                    parts.append(cls._from_dicts(pending))
+                    pending = []
+                parts.append(model)
+            elif validate_model(model):
+                pending.append(model)
+            else:
+                print(f"WARNING: Invalid model format: {model}")
+        if pending:
+            parts.append(cls._from_dicts(pending))
+        if not parts:
+            return cls()
+        if len(parts) == 1:
+            return parts[0]
+        return cls.concat(parts)
+
+    @classmethod
+    def _from_dicts(cls, models):
+        scene = cls()
+        path_lookup = {}
+        collection_lookup = {}
+        kinds = []
+        path_index = []
+        collection_index = []
+        max_triangles = []
+        focal_lengths = []
+        for row, model in enumerate(models):
+            kind = model.get("type", "model")
+            kinds.append(KINDS.index(kind))
+            scene.names.append(model["name"])
+            if kind == "camera":
+                path_index.append(-1)
+            else:
+                file_path = model["file_path"]
+                if file_path not in path_lookup:
+                    path_lookup[file_path] = len(scene.paths)
+                    scene.paths.append(file_path)
+                    scene.path_formats.append(model.get("file_format", os.path.splitext(file_path)[1].lower()))
+                    scene.path_probes.append(model.get("probe"))
+                path_index.append(path_lookup[file_path])
+            collection_name = model.get("collection_name", "Cameras" if kind == "camera" else "3D_Model")
+            if collection_name not in collection_lookup:
+                collection_lookup[collection_name] = len(scene.collections)
+                scene.collections.append(collection_name)
+            collection_index.append(collection_lookup[collection_name])
+            max_triangles.append(model.get("max_triangles", 0))
+            focal_lengths.append(model.get("focal_length", 0.0))
+            if kind == "scatter":
+                scene.instances[row] = model["instances"]
+            if model.get("probe_warnings"):
+                scene.warnings[row] = list(model["probe_warnings"])
+
+        scene.kinds = np.array(kinds, dtype=np.uint8)
+        scene.path_index = np.array(path_index, dtype=np.int32)
+        scene.collection_index = np.array(collection_index, dtype=np.int32)
+        scene.transforms = np.array([tuple(model["position"]) + tuple(model["rotation"]) + tuple(model["scale"])
+                                     for model in models], dtype=np.float32).reshape(-1, 9)
+        scene.max_triangles = np.array(max_triangles, dtype=np.int64)
+        scene.focal_lengths = np.array(focal_lengths, dtype=np.float32)
+        return scene
+
+    @classmethod
+    def concat(cls, parts):
+        """合并多个场景描述，路径和集合名重新去重，索引按数组整体重映射"""
+        scene = cls()
+        path_lookup = {}
+        collection_lookup = {}
+        path_index = []
+        collection_index = []
+        offset = 0
+        for part in parts:
+            path_map = np.array([path_lookup.setdefault(path, len(path_lookup)) for path in part.paths] + [-1],
+                                dtype=np.int32)
+            for path, file_format, probe in zip(part.paths, part.path_formats, part.path_probes):
+                if path_lookup[path] == len(scene.paths):
+                    scene.paths.append(path)
+                    scene.path_formats.append(file_format)
+                    scene.path_probes.append(probe)
+            collection_map = np.array([collection_lookup.setdefault(name, len(collection_lookup))
+                                       for name in part.collections], dtype=np.int32)
+            for name in part.collections:
+                if collection_lookup[name] == len(scene.collections):
+                    scene.collections.append(name)
+            # -1（摄像机无路径）映射到 path_map 的最后一项 -1
+            path_index.append(path_map[part.path_index])
+            collection_index.append(collection_map[part.collection_index])
+            scene.names.extend(part.names)
+            scene.instances.update({offset + row: arrays for row, arrays in part.instances.items()})
+            scene.warnings.update({offset + row: warnings for row, warnings in part.warnings.items()})
+            offset += len(part)
+
+        scene.kinds = np.concatenate([part.kinds for part in parts])
+        scene.path_index = np.concatenate(path_index).astype(np.int32)
+        scene.collection_index = np.concatenate(collection_index).astype(np.int32)
+        scene.transforms = np.concatenate([part.transforms for part in parts])
+        scene.max_triangles = np.concatenate([part.max_triangles for part in parts])
+        scene.focal_lengths = np.concatenate([part.focal_lengths for part in parts])
+        return scene
+
+    def save(self, path):
+        """写出未压缩的 .npz（Blender脚本用 np.load 读取，字符串表为定长Unicode数组，无需pickle）"""
+        arrays = {
+            "kinds": self.kinds,
+            "names": np.array(self.names, dtype=str),
+            "path_index": self.path_index,
+            "paths": np.array(self.paths, dtype=str),
+            "path_formats": np.array(self.path_formats, dtype=str),
+            "collection_index": self.collection_index,
+            "collections": np.array(self.collections, dtype=str),
+            "transforms": np.ascontiguousarray(self.transforms, dtype=np.float32),
+            "max_triangles": self.max_triangles,
+            "focal_lengths": self.focal_lengths,
+        }
+        for row, instances in self.instances.items():
+            for key, values in instances.items():
+                arrays[f"instances_{row}_{key}"] = np.ascontiguousarray(values, dtype=np.float32)
+        np.savez(path, **arrays)
+
+
+def _flatten(models):
+    if models is None:
+        return
+    if isinstance(models, (list, tuple)):
+        for model in models:
+            yield from _flatten(model)
+    else:
+        yield models
@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+
+from .blender_job import blender_job_dir
+from .blender_worker_pool import BlenderWorkerError, run_blender_script
+from .disk_cache import DiskLRUCache, file_digest
+
+# 场景元数据索引：以blend文件内容哈希为键，查询时无需启动Blender
+SCENE_INDEX = DiskLRUCache("scene_index", int(os.environ.get("BLENDER_SCENE_INDEX_MB", "64")) * 1024 * 1024)
+
+
+def lookup_scene_info(blend_path):
+    """返回已索引的场景信息，未索引或文件不存在时返回None（不启动Blender）"""
+    try:
+        path = SCENE_INDEX.get(file_digest(blend_path), ".json")
+    except (OSError, TypeError):
+        return None
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_scene_info(blend_path, info):
+    """把场景信息写入索引"""
+    digest = file_digest(blend_path)
+    tmp_path = SCENE_INDEX.reserve(digest, ".json")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+    except Exception:
+        SCENE_INDEX.discard(tmp_path)
+        raise
+    SCENE_INDEX.commit(digest, ".json", tmp_path)
+
+
+def get_scene_info(blend_path, use_pool=True):
+    """返回(场景信息, 错误信息)，未索引时启动Blender提取一次并写入索引"""
+    info = lookup_scene_info(blend_path)
+    if info is not None:
+        return info, None
+
+    # 作业目录放在系统临时目录，不放进索引缓存目录（evict 会遍历并计入缓存目录中的文件）
+    with blender_job_dir(tempfile.gettempdir(), "scene_info") as job_dir:
+        param_json_path = os.path.join(job_dir, "_scene_info_params.json")
+        info_path = os.path.join(job_dir, "scene_info.json")
+        with open(param_json_path, "w", encoding="utf-8") as f:
+            json.dump({"blend_file_path": blend_path, "info_path": info_path}, f, ensure_ascii=False)
+        script_path = os.path.join(job_dir, "_scene_info_script.py")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(BLENDER_SCENE_INFO_FUNCTIONS + _BLENDER_SCENE_INFO_SCRIPT)
+
+        output_lines = []
+        try:
+            returncode = run_blender_script(script_path, [param_json_path], cwd=job_dir,
+                                            on_line=output_lines.append, use_pool=use_pool)
+        except BlenderWorkerError as e:
+            return None, f"Scene introspection failed: {e}"
+        if returncode != 0 or not os.path.exists(info_path):
+            stdout = "\n".join(output_lines)
+            return None, f"Scene introspection failed (return code: {returncode}): {stdout[-2000:]}"
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+
+    store_scene_info(blend_path, info)
+    return info, None
+
+
+def missing_cameras(info, camera_names, camera_collection=""):
+    """返回场景信息中找不到的相机名（相机名不区分大小写，与渲染脚本一致）"""
+    known = {camera["name"].lower() for camera in info.get("cameras", [])}
+    missing = [name for name in camera_names if name.lower() not in known]
+    if camera_collection and not any(c["name"] == camera_collection for c in info.get("collections", [])):
+        missing.append(f"collection:{camera_collection}")
+    return missing
+
+
+# Blender-side helpers shared by the introspection script and the composer,
+# which indexes its output right after saving
+BLENDER_SCENE_INFO_FUNCTIONS = r'''
+import bpy
+import json
+import mathutils
+import numpy as np
+
+
+def _world_bounds(obj):
+    corners = [obj.matrix_world @ mathutils.Vector(corner) for corner in obj.bound_box]
+    return (
+        [min(c[i] for c in corners) for i in range(3)],
+        [max(c[i] for c in corners) for i in range(3)],
+    )
+
+
+def collect_scene_info():
+    """Cameras, objects, collections, bounds and triangle counts of the current scene"""
+    scene = bpy.context.scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    cameras = []
+    objects = []
+    scene_min = None
+    scene_max = None
+    total_triangles = 0
+
+    # Cameras are listed from bpy.data.objects, the same set the render script searches
+    for obj in bpy.data.objects:
+        if obj.type == 'CAMERA':
+            cameras.append({
+                "name": obj.name,
+                "lens": obj.data.lens,
+                "location": list(obj.matrix_world.translation),
+                "rotation": list(obj.matrix_world.to_euler()),
+                "collections": [c.name for c in obj.users_collection],
+            })
+
+    for obj in scene.objects:
+        entry = {
+            "name": obj.name,
+            "type": obj.type,
+            "parent": obj.parent.name if obj.parent else None,
+            "collections": [c.name for c in obj.users_collection],
+        }
+        if obj.type in {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT'}:
+            evaluated = obj.evaluated_get(depsgraph)
+            mesh = evaluated.to_mesh()
+            triangles = 0
+            if mesh:
+                loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+                mesh.polygons.foreach_get("loop_total", loop_totals)
+                triangles = int(loop_totals.sum()) - 2 * len(loop_totals)
+            evaluated.to_mesh_clear()
+            bounds_min, bounds_max = _world_bounds(obj)
+            entry["triangles"] = triangles
+            entry["bounds"] = {"min": bounds_min, "max": bounds_max}
+            total_triangles += triangles
+            if scene_min is None:
+                scene_min, scene_max = list(bounds_min), list(bounds_max)
+            else:
+                scene_min = [min(a, b) for a, b in zip(scene_min, bounds_min)]
+                scene_max = [max(a, b) for a, b in zip(scene_max, bounds_max)]
+        objects.append(entry)
+
+    collections = [
+        {
+            "name": collection.name,
+            "objects": len(collection.objects),
+            "children": [child.name for child in collection.children],
+        }
+        for collection in bpy.data.collections
+    ]
+
+    return {
+        "blender_version": bpy.app.version_string,
+        "scene": scene.name,
+        "active_camera": scene.camera.name if scene.camera else None,
+        "frame_start": scene.frame_start,
+        "frame_end": scene.frame_end,
+        "resolution": [scene.render.resolution_x, scene.render.resolution_y],
+        "cameras": cameras,
+        "objects": objects,
+        "collections": collections,
+        "bounds": {"min": scene_min, "max": scene_max} if scene_min is not None else None,
+        "triangles": total_triangles,
+    }
+
+
+def write_scene_info(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(collect_scene_info(), f, ensure_ascii=False)
+'''
+
+# Blender scene introspection script
+_BLENDER_SCENE_INFO_SCRIPT = r'''
+import sys
+
+param_json = next((arg for arg in sys.argv if arg.endswith("_scene_info_params.json")), None)
+if not param_json:
+    print("No param json found!")
+    sys.exit(1)
+
+with open(param_json, "r", encoding="utf-8") as f:
+    params = json.load(f)
+
+try:
+    bpy.ops.wm.open_mainfile(filepath=params["blend_file_path"])
+except Exception as e:
+    print(f"Error loading blend file: {e}")
+    sys.exit(1)
+
+write_scene_info(params["info_path"])
+print(f"Indexed scene: {params['blend_file_path']}")
+'''
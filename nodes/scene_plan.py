@@ -0,0 +1,88 @@
+import json
+import os
+
+from .blender_output import BlenderLogCapture
+from .blender_worker_pool import BlenderWorkerError, run_blender_steps
+
+
+class ScenePlanStep:
+    """场景计划中的一步：执行时在作业目录中写出脚本和参数，执行后发布产物
+
+    script 为脚本内容，或按作业目录生成脚本内容的函数 script(job_dir)。
+    prepare(job_dir) 返回参数字典，写入以 params_name 结尾的文件作为脚本参数（脚本按后缀查找）；
+    complete(job_dir, returncode, output, log_messages) 在整个会话结束后调用（无论成功与否），
+    负责发布产物和写日志，output 为该会话的 BlenderLogCapture。result_prefixes 为 complete 要用
+    output.find 查找的结果行前缀，这些行在读入时保存，不受后续步骤输出量的影响。
+    """
+
+    def __init__(self, name, script, params_name=None, prepare=None, complete=None, result_prefixes=()):
+        self.name = name
+        self.script = script
+        self.params_name = params_name
+        self.prepare = prepare
+        self.complete = complete
+        self.result_prefixes = tuple(result_prefixes)
+
+
+class ScenePlan:
+    """延迟执行的场景句柄，在节点之间代替blend路径传递
+
+    没有步骤时只是一个已存在的blend文件；有步骤时由下游节点把这些步骤和自己的脚本
+    放进同一个Blender会话执行，场景无需在步骤之间保存和重新加载。
+    """
+
+    def __init__(self, blend_path="", steps=(), log_level="summary"):
+        self.blend_path = blend_path
+        self.steps = tuple(steps)
+        self.log_level = log_level
+
+    @property
+    def deferred(self):
+        return bool(self.steps)
+
+    def then(self, step, blend_path=None):
+        """返回追加了一步的新计划（计划本身不可变，便于ComfyUI缓存上游结果）"""
+        return ScenePlan(self.blend_path if blend_path is None else blend_path, self.steps + (step,), self.log_level)
+
+    def describe(self):
+        return " -> ".join(step.name for step in self.steps) or self.blend_path
+
+    def execute(self, job_dir, final_steps, log_messages, on_line=None, use_pool=True):
+        """在同一个Blender会话中依次执行计划中的步骤和 final_steps，返回返回码
+
+        final_steps 为调用方自己的 [(脚本路径, 参数列表), ...]。输出按计划的详细程度打印到控制台，
+        给出 on_line 时每一行另外交给调用方解析（调用方不应再打印）。
+        """
+        steps = []
+        for index, step in enumerate(self.steps):
+            args = []
+            if step.prepare is not None:
+                param_path = os.path.join(job_dir, f"{index:02d}_{step.params_name}")
+                with open(param_path, "w", encoding="utf-8") as f:
+                    json.dump(step.prepare(job_dir), f, ensure_ascii=False, indent=2)
+                args.append(param_path)
+            script_path = os.path.join(job_dir, f"{index:02d}_{step.name}_script.py")
+            with open(script_path, "w", encoding="utf-8") as f:
+                f.write(step.script(job_dir) if callable(step.script) else step.script)
+            steps.append((script_path, args))
+
+        result_prefixes = [prefix for step in self.steps for prefix in step.result_prefixes]
+        output = BlenderLogCapture(self.log_level, result_prefixes=result_prefixes)
+
+        def collect(line):
+            output.feed(line)
+            if on_line is not None:
+                on_line(line)
+
+        log_messages.append(f"Scene plan: {self.describe()}")
+        try:
+            returncode = run_blender_steps(steps + list(final_steps), cwd=job_dir, on_line=collect,
+                                           use_pool=use_pool)
+        except BlenderWorkerError as e:
+            # 超时等情况同样交给各步骤的 complete 清理（释放缓存预留等）
+            log_messages.append(f"ERROR: {e}")
+            returncode = 1
+        for step in self.steps:
+            if step.complete is not None:
+                step.complete(job_dir, returncode, output, log_messages)
+        return returncode